@@ -0,0 +1,245 @@
+"""
+技术指标数值计算内核
+
+策略中的递推计算（EMA、Wilder平滑等）在纯Python中需要逐元素解释执行，
+这里将其提取为接收float64数组的函数，并使用Numba编译为本地代码。
+未安装Numba时退化为普通Python函数，计算结果不变。
+
+各内核均声明了显式签名，Numba在模块导入时即完成编译（cache=True时直接从
+__pycache__加载已编译的机器码），避免首次分析请求承担JIT编译延迟。
+并行内核的线程池在首次调用时才启动，由StrategyEngine构造时调用warmup()完成。
+内核只接受C连续的float64一维数组。
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba为可选依赖
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+    prange = range
+
+# EMA平滑系数 alpha = 2/(N+1)
+# 递推写作 ema += alpha * (x - ema)，与 x*alpha + ema*(1-alpha) 等价，
+# 只需一次减法和一次乘加（fastmath下编译为FMA指令）
+A12 = 2 / 13
+A26 = 2 / 27
+A9 = 2 / 10
+
+
+@njit('UniTuple(float64, 3)(float64[::1])', cache=True, nogil=True, fastmath=True)
+def ma_kernel(c):
+    """
+    计算MA5、MA10、MA20（最近N个收盘价的简单平均）
+
+    从最后一个收盘价向前累加一次，依次得到三个窗口的和。
+
+    Args:
+        c: 收盘价数组（float64）
+
+    Returns:
+        (MA5, MA10, MA20)，数据不足的均线为NaN
+    """
+    n = c.shape[0]
+    ma5 = np.nan
+    ma10 = np.nan
+    ma20 = np.nan
+    total = 0.0
+    for k in range(1, min(n, 20) + 1):
+        total += c[n - k]
+        if k == 5:
+            ma5 = total / 5
+        elif k == 10:
+            ma10 = total / 10
+        elif k == 20:
+            ma20 = total / 20
+    return ma5, ma10, ma20
+
+
+@njit('UniTuple(float64, 4)(float64[::1])', cache=True, nogil=True, fastmath=True)
+def macd_kernel(c):
+    """
+    计算MACD指标
+
+    Args:
+        c: 收盘价数组（float64）
+
+    Returns:
+        (EMA12, EMA26, DIF, DEA)，均为最后一个交易日的值；无数据时均为0.0
+    """
+    n = c.shape[0]
+    if n == 0:
+        return 0.0, 0.0, 0.0, 0.0
+    # EMA以第一个收盘价为初始值；DEA为DIF的9日EMA，以第二个交易日的DIF为初始值
+    # 三条递推在同一次遍历中完成，无需保存DIF序列
+    ema12 = c[0]
+    ema26 = c[0]
+    dif = 0.0
+    dea = 0.0
+    for i in range(1, n):
+        ema12 += A12 * (c[i] - ema12)
+        ema26 += A26 * (c[i] - ema26)
+        dif = ema12 - ema26
+        if i == 1:
+            dea = dif
+        else:
+            dea += A9 * (dif - dea)
+    return ema12, ema26, dif, dea
+
+
+@njit('Tuple((float64, float64, float64, int64, int64))(float64[::1], int64)',
+      cache=True, nogil=True, fastmath=True)
+def rsi_kernel(c, period):
+    """
+    计算RSI指标（Wilder平滑），一次遍历完成涨跌统计与平滑
+
+    前period个价格变动取简单平均作为初始值，之后按
+    avg = (avg_prev * (period-1) + 当日值) / period 平滑；历史数据不足period个变动时取全部变动的平均值。
+
+    Args:
+        c: 收盘价数组（float64）
+        period: 平滑周期（通常为14）
+
+    Returns:
+        (RSI, avg_gain, avg_loss, 上涨天数, 下跌天数)，没有任何涨跌时RSI为50
+    """
+    n = c.shape[0]
+    up_days = 0
+    dn_days = 0
+    ag = 0.0
+    al = 0.0
+    if n < 2:
+        return 50.0, ag, al, up_days, dn_days
+    k = min(period, n - 1)
+    for i in range(1, k + 1):
+        d = c[i] - c[i - 1]
+        if d > 0:
+            ag += d
+            up_days += 1
+        elif d < 0:
+            al -= d
+            dn_days += 1
+    ag /= k
+    al /= k
+    for i in range(k + 1, n):
+        d = c[i] - c[i - 1]
+        g = 0.0
+        l = 0.0
+        if d > 0:
+            g = d
+            up_days += 1
+        elif d < 0:
+            l = -d
+            dn_days += 1
+        ag = (ag * (period - 1) + g) / period
+        al = (al * (period - 1) + l) / period
+    # 100 - 100/(1+ag/al) 化简为 100*ag/(ag+al)，无涨跌时取中性值50
+    tot = ag + al
+    rsi = 50.0 if tot == 0.0 else 100.0 * ag / tot
+    return rsi, ag, al, up_days, dn_days
+
+
+@njit('UniTuple(float64, 2)(float64[::1], int64)', cache=True, nogil=True, fastmath=True)
+def bb_kernel(c, period):
+    """
+    计算最近period个收盘价的均值与总体标准差
+
+    先求均值再累加离差平方（两遍遍历）。E[x^2] - E[x]^2 的单遍写法在价格高、
+    波动小时会因大数相减丢失精度，把很小的标准差算成0，导致误判“布林带收窄”。
+    数据不足period个时使用全部数据，无数据时返回(0.0, 0.0)。
+
+    Args:
+        c: 收盘价数组（float64）
+        period: 窗口长度（通常为20）
+
+    Returns:
+        (均值, 标准差)
+    """
+    n = c.shape[0]
+    k = period if n >= period else n
+    if k == 0:
+        return 0.0, 0.0
+    s = 0.0
+    for i in range(n - k, n):
+        s += c[i]
+    mean = s / k
+    m2 = 0.0
+    for i in range(n - k, n):
+        d = c[i] - mean
+        m2 += d * d
+    return mean, (m2 / k) ** 0.5
+
+
+def sma_series(c: np.ndarray, w: int) -> np.ndarray:
+    """
+    计算每个交易日的w日简单移动平均序列（用于回测等需要逐日均线的场景）
+
+    Args:
+        c: 收盘价数组（float64）
+        w: 窗口长度
+
+    Returns:
+        长度为len(c)-w+1的数组，第i个元素为c[i:i+w]的平均值；数据不足w个时返回空数组
+    """
+    if w <= 0 or c.shape[0] < w:
+        return np.empty(0, dtype=np.float64)
+    return sliding_window_view(c, w).mean(axis=1)
+
+
+# batch_indicators输出矩阵的列
+BATCH_COLUMNS = ('MA5', 'MA10', 'MA20', 'EMA12', 'EMA26', 'DIF', 'DEA',
+                 'RSI', 'avg_gain', 'avg_loss', 'up_days', 'down_days', 'BB_MA20', 'BB_std')
+
+
+@njit('void(float64[:, ::1], int64[::1], float64[:, ::1])',
+      cache=True, nogil=True, fastmath=True, parallel=True)
+def batch_indicators(C, lengths, out):
+    """
+    并行计算多只股票的技术指标
+
+    Args:
+        C: 收盘价矩阵（S只股票 × N天），第s行前lengths[s]个元素有效
+        lengths: 每只股票的有效历史数据条数（为0时均线为NaN，其余指标为0或中性值）
+        out: 输出矩阵（S × len(BATCH_COLUMNS)），数据不足的均线为NaN
+    """
+    for s in prange(C.shape[0]):
+        c = C[s, :lengths[s]]
+        ma5, ma10, ma20 = ma_kernel(c)
+        out[s, 0] = ma5
+        out[s, 1] = ma10
+        out[s, 2] = ma20
+        ema12, ema26, dif, dea = macd_kernel(c)
+        out[s, 3] = ema12
+        out[s, 4] = ema26
+        out[s, 5] = dif
+        out[s, 6] = dea
+        rsi, ag, al, up_days, dn_days = rsi_kernel(c, 14)
+        out[s, 7] = rsi
+        out[s, 8] = ag
+        out[s, 9] = al
+        out[s, 10] = up_days
+        out[s, 11] = dn_days
+        mean, std = bb_kernel(c, 20)
+        out[s, 12] = mean
+        out[s, 13] = std
+
+
+_warmed = False
+
+
+def warmup():
+    """以小数组调用各内核一次，确保编译缓存已加载、并行线程池已启动；重复调用直接返回"""
+    global _warmed
+    if _warmed:
+        return
+    c = np.zeros(30)
+    ma_kernel(c)
+    macd_kernel(c)
+    rsi_kernel(c, 14)
+    bb_kernel(c, 20)
+    batch_indicators(c.reshape(1, -1), np.array([30], dtype=np.int64), np.empty((1, len(BATCH_COLUMNS))))
+    _warmed = True
@@ -1,10 +1,16 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, request, send_from_directory
 from flask_cors import CORS
 from .config import Config
-from .eastmoney_api import EastMoneyAPI
+from .eastmoney_api import _UPSTREAM_ERRORS, EastMoneyAPI
 from .trading_engine import DataManager, TradingEngine
 from .strategies import StrategyEngine
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import logging
+import orjson
 import os
+import threading
+import time
 
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
 app.config.from_object(Config)
@@ -12,13 +18,74 @@ CORS(app)
 
 data_manager = DataManager()
 trading_engine = TradingEngine(data_manager)
+atexit.register(trading_engine.flush)  # 退出前写入尚在节流等待中的账户和持仓快照
 eastmoney_api = EastMoneyAPI()
-strategy_engine = StrategyEngine()
+strategy_engine = StrategyEngine(verbose=True)  # 前端需要展示计算过程
+
+# 并发获取行情的线程池（与EastMoneyAPI共享连接池）
+_EXECUTOR = ThreadPoolExecutor(max_workers=10)
+
+logger = logging.getLogger(__name__)
+
+def _prefetch_position_quotes():
+    """后台定时批量刷新持仓股票行情，使前端轮询直接命中行情缓存"""
+    while True:
+        time.sleep(Config.QUOTE_PREFETCH_INTERVAL)
+        stock_codes = [pos.stock_code for pos in trading_engine.get_positions()]
+        if not stock_codes:
+            continue
+        try:
+            eastmoney_api.get_stock_quotes_batch(stock_codes, use_cache=False)
+        except _UPSTREAM_ERRORS as e:
+            logger.warning("预热持仓行情失败: %s", e)
+
+_prefetch_started = False
+_prefetch_lock = threading.Lock()
+
+def start_prefetch():
+    """启动持仓行情预热线程（每个进程只启动一次）；由服务入口显式调用，导入模块时不会启动"""
+    global _prefetch_started
+    with _prefetch_lock:
+        if _prefetch_started:
+            return
+        _prefetch_started = True
+    threading.Thread(target=_prefetch_position_quotes, name='quote-prefetch', daemon=True).start()
+
+def create_app():
+    """生产环境入口（gunicorn 'backend.app:create_app()'）：启动后台任务并返回应用"""
+    start_prefetch()
+    return app
+
+def _default(obj):
+    """orjson回调：模型对象（Position、Trade等）和Quote行情直接在编码过程中转换为字典"""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if hasattr(obj, '_asdict'):
+        return obj._asdict()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def make_response_json(payload):
+    """使用orjson序列化响应数据，替代jsonify"""
+    return app.response_class(orjson.dumps(payload, default=_default), mimetype='application/json')
+
+def make_response_bytes(body: bytes):
+    """直接返回预先序列化好的JSON响应体"""
+    return app.response_class(body, mimetype='application/json')
+
+# 固定内容的响应体，启动时序列化一次
+_HEALTH_OK = orjson.dumps({'success': True, 'message': 'Server is running'})
+_ACCOUNT_RESET = orjson.dumps({'success': True, 'message': '账户已重置'})
+_PARAMS_INCOMPLETE = orjson.dumps({'success': False, 'message': '参数不完整'})
+_MISSING_KEYWORD = orjson.dumps({'success': False, 'message': '请输入搜索关键词'})
+_MISSING_STOCK_CODE = orjson.dumps({'success': False, 'message': '请输入股票代码'})
+_MISSING_STOCK_CODES = orjson.dumps({'success': False, 'message': '请提供股票代码列表'})
+_MISSING_ANALYZE_CODE = orjson.dumps({'success': False, 'message': '请提供股票代码'})
+_QUOTE_FAILED = orjson.dumps({'success': False, 'message': '获取股票行情失败'})
 
 @app.route('/api/account', methods=['GET'])
 def get_account():
     account = trading_engine.get_account()
-    return jsonify({
+    return make_response_json({
         'success': True,
         'data': account.to_dict()
     })
@@ -26,35 +93,32 @@ def get_account():
 @app.route('/api/account/reset', methods=['POST'])
 def reset_account():
     trading_engine.reset_account()
-    return jsonify({
-        'success': True,
-        'message': '账户已重置'
-    })
+    return make_response_bytes(_ACCOUNT_RESET)
 
 @app.route('/api/positions', methods=['GET'])
 def get_positions():
     positions = trading_engine.get_positions()
-    return jsonify({
+    return make_response_json({
         'success': True,
-        'data': [pos.to_dict() for pos in positions]
+        'data': positions
     })
 
 @app.route('/api/trades', methods=['GET'])
 def get_trades():
     trades = trading_engine.get_trades()
-    return jsonify({
+    return make_response_json({
         'success': True,
-        'data': [trade.to_dict() for trade in reversed(trades)]
+        'data': list(reversed(trades))
     })
 
 @app.route('/api/stock/search', methods=['GET'])
 def search_stock():
     keyword = request.args.get('keyword', '')
     if not keyword:
-        return jsonify({'success': False, 'message': '请输入搜索关键词'})
+        return make_response_bytes(_MISSING_KEYWORD)
     
     results = eastmoney_api.search_stock(keyword)
-    return jsonify({
+    return make_response_json({
         'success': True,
         'data': results
     })
@@ -63,39 +127,40 @@ def search_stock():
 def get_stock_quote():
     stock_code = request.args.get('stock_code')
     if not stock_code:
-        return jsonify({'success': False, 'message': '请输入股票代码'})
+        return make_response_bytes(_MISSING_STOCK_CODE)
     
     quote = eastmoney_api.get_stock_quote(stock_code)
     if quote:
-        trading_engine.update_positions_price(stock_code, quote['current_price'])
-        return jsonify({
+        trading_engine.update_positions_price(stock_code, quote.current_price)
+        return make_response_json({
             'success': True,
-            'data': quote
+            'data': quote._asdict()
         })
     else:
-        return jsonify({
-            'success': False,
-            'message': '获取股票行情失败'
-        })
+        return make_response_bytes(_QUOTE_FAILED)
 
 @app.route('/api/stock/quotes', methods=['POST'])
 def get_stock_quotes():
     stock_codes = request.json.get('stock_codes', [])
     if not stock_codes:
-        return jsonify({'success': False, 'message': '请提供股票代码列表'})
+        return make_response_bytes(_MISSING_STOCK_CODES)
     
-    quotes = {}
-    price_dict = {}
-    for code in stock_codes:
-        quote = eastmoney_api.get_stock_quote(code)
-        if quote:
-            quotes[code] = quote
-            price_dict[code] = quote['current_price']
+    quotes = eastmoney_api.get_stock_quotes_batch(stock_codes)
+
+    # 批量接口未返回的股票，并发逐个获取
+    missing_codes = [code for code in stock_codes if code not in quotes]
+    if missing_codes:
+        results = _EXECUTOR.map(eastmoney_api.get_stock_quote, missing_codes)
+        for code, quote in zip(missing_codes, results):
+            if quote:
+                quotes[code] = quote
+
+    price_dict = {code: quote.current_price for code, quote in quotes.items()}
     
     if price_dict:
         trading_engine.update_all_positions_price(price_dict)
     
-    return jsonify({
+    return make_response_json({
         'success': True,
         'data': quotes
     })
@@ -109,10 +174,10 @@ def buy_stock():
     shares = int(data.get('shares', 0))
     
     if not all([stock_code, stock_name, price, shares]):
-        return jsonify({'success': False, 'message': '参数不完整'})
+        return make_response_bytes(_PARAMS_INCOMPLETE)
     
     success, message = trading_engine.buy_stock(stock_code, stock_name, price, shares)
-    return jsonify({
+    return make_response_json({
         'success': success,
         'message': message
     })
@@ -126,10 +191,10 @@ def sell_stock():
     shares = int(data.get('shares', 0))
     
     if not all([stock_code, stock_name, price, shares]):
-        return jsonify({'success': False, 'message': '参数不完整'})
+        return make_response_bytes(_PARAMS_INCOMPLETE)
     
     success, message = trading_engine.sell_stock(stock_code, stock_name, price, shares)
-    return jsonify({
+    return make_response_json({
         'success': success,
         'message': message
     })
@@ -141,10 +206,12 @@ def analyze_strategy():
     strategy_type = data.get('strategy_type', 'ma')
     
     if not stock_code:
-        return jsonify({'success': False, 'message': '请提供股票代码'})
+        return make_response_bytes(_MISSING_ANALYZE_CODE)
     
     result = strategy_engine.analyze(stock_code, strategy_type)
-    return jsonify({
+    if result.error:
+        return make_response_bytes(_QUOTE_FAILED)
+    return make_response_json({
         'success': True,
         'data': result
     })
@@ -153,7 +220,7 @@ def analyze_strategy():
 def get_market_index():
     index_code = request.args.get('index_code', '000001')
     index = eastmoney_api.get_market_index(index_code)
-    return jsonify({
+    return make_response_json({
         'success': True,
         'data': index
     })
@@ -165,10 +232,10 @@ def get_stock_history():
     count = int(request.args.get('count', 30))
     
     if not stock_code:
-        return jsonify({'success': False, 'message': '请输入股票代码'})
+        return make_response_bytes(_MISSING_STOCK_CODE)
     
     history = eastmoney_api.get_stock_history(stock_code, period, count)
-    return jsonify({
+    return make_response_json({
         'success': True,
         'data': history
     })
@@ -180,21 +247,21 @@ def get_market_index_history():
     count = int(request.args.get('count', 30))
     
     history = eastmoney_api.get_index_history(index_code, period, count)
-    return jsonify({
+    return make_response_json({
         'success': True,
         'data': history
     })
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({
-        'success': True,
-        'message': 'Server is running'
-    })
+    return make_response_bytes(_HEALTH_OK)
 
 @app.route('/')
 def index():
     return send_from_directory('../frontend', 'index.html')
 
 if __name__ == '__main__':
+    # debug模式下重载器的监控进程只负责重启，后台任务只在实际处理请求的子进程中启动
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_prefetch()
     app.run(debug=True, host='0.0.0.0', port=5000)
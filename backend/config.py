@@ -5,7 +5,10 @@ class Config:
     INITIAL_CAPITAL = 100000.0  # 初始资金10万元
     COMMISSION_RATE = 0.0003    # 手续费率万分之3
     MIN_COMMISSION = 5.0        # 最低手续费5元
+    QUOTE_PREFETCH_INTERVAL = 1.5  # 持仓行情预热间隔（秒），应小于行情缓存的2秒有效期
+    SNAPSHOT_INTERVAL = 5.0        # 账户和持仓快照的最短写盘间隔（秒），交易记录仍逐笔追加
     DATA_DIR = 'data'
     ACCOUNT_FILE = os.path.join(DATA_DIR, 'account.json')
     POSITIONS_FILE = os.path.join(DATA_DIR, 'positions.json')
-    TRADES_FILE = os.path.join(DATA_DIR, 'trades.json')
+    TRADES_FILE = os.path.join(DATA_DIR, 'trades.json')          # 旧版交易记录（整体JSON数组，仅用于迁移）
+    TRADES_LOG_FILE = os.path.join(DATA_DIR, 'trades.jsonl')     # 交易记录（追加写，每行一条）
@@ -1,12 +1,141 @@
+import logging
 import requests
-import json
-from typing import Dict, List, Optional
+import orjson
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 共享HTTP会话：复用TCP连接（keep-alive），避免每次请求重新握手；启用gzip/deflate压缩传输
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=32, pool_maxsize=64,
+                       max_retries=Retry(total=2, backoff_factor=0.2))
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate',
+})
+
+logger = logging.getLogger(__name__)
+
+# 上游请求可预期的失败：网络错误、响应解析失败（orjson.JSONDecodeError为ValueError子类）、
+# 响应字段缺失；其余异常视为程序错误直接抛出。停牌时为"-"的数值字段由_num显式处理
+_UPSTREAM_ERRORS = (requests.RequestException, ValueError, KeyError)
+
+# 接口地址与请求字段（模块级常量，避免每次调用重复构建）
+_BASE_URL = "http://push2.eastmoney.com/api/qt"
+_QUOTE_URL = f"{_BASE_URL}/stock/get"
+_QUOTE_FIELDS = 'f43,f44,f45,f46,f47,f48,f49,f50,f51,f52,f57,f58,f60,f107,f116,f117,f168,f169,f170'
+_BATCH_QUOTE_URL = f"{_BASE_URL}/ulist.np/get"
+_BATCH_QUOTE_FIELDS = 'f2,f3,f4,f5,f6,f12,f14,f15,f16,f17,f18,f124'
+_INDEX_FIELDS = 'f43,f44,f45,f46,f60,f170'
+_SEARCH_URL = "http://searchapi.eastmoney.com/api/suggest/get"
+_KLINE_URL = "https://push2his.eastmoney.com/api/qt/stock/kline/get"
+_KLINE_FIELDS1 = 'f1,f2,f3,f4,f5,f6'
+_KLINE_FIELDS2 = 'f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61'
+# 周期映射
+_PERIOD_MAP = {
+    'day': 101,
+    'week': 102,
+    'month': 103
+}
+
+# 短时缓存：合并前端轮询产生的重复请求（行情2秒，历史K线30秒）
+_QUOTE_CACHE = TTLCache(maxsize=1024, ttl=2)
+_HISTORY_CACHE = TTLCache(maxsize=256, ttl=30)
+_CACHE_LOCK = threading.Lock()
+
+
+def _cache_get(cache: TTLCache, key):
+    with _CACHE_LOCK:
+        return cache.get(key)
+
+
+def _cache_set(cache: TTLCache, key, value):
+    with _CACHE_LOCK:
+        cache[key] = value
+
+
+def _num(value, scale: float = 1):
+    """将接口返回的数值字段除以scale（scale为1时原样返回）；停牌等情况下字段为"-"（非数值）时返回None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value / scale if scale != 1 else value
+    return None
+
+
+class Quote(NamedTuple):
+    """实时行情（不可变，缓存中的同一对象可在多个请求间安全共享）"""
+    stock_code: str
+    stock_name: str
+    current_price: float
+    open_price: float
+    high_price: float
+    low_price: float
+    pre_close: float
+    volume: float
+    amount: float
+    change: float
+    change_percent: float
+    timestamp: int
+
+
+def _parse_klines(klines: List[str]) -> List[Dict]:
+    """解析K线字符串列表（日期,开,收,高,低,成交量,成交额,...），每个字段只转换一次"""
+    # 注：返回值需为逐行字典，pandas/NumPy向量化解析后再转回字典反而更慢，故保留逐行解析
+    history_data = []
+    for kline in klines:
+        parts = kline.split(',', 10)
+        if len(parts) >= 11:
+            open_price = float(parts[1])
+            close_price = float(parts[2])
+            change = close_price - open_price
+            history_data.append({
+                'date': parts[0],
+                'open': open_price,
+                'close': close_price,
+                'high': float(parts[3]),
+                'low': float(parts[4]),
+                'volume': int(parts[5]),
+                'amount': float(parts[6]),
+                'change': change,
+                'change_percent': change / open_price * 100 if open_price > 0 else 0
+            })
+    return history_data
+
+
+# 当前日期字符串缓存：[生成时间, 'YYYYMMDD']
+_today_cache = [0.0, '']
+
+
+def _today_str() -> str:
+    """返回当前日期（YYYYMMDD格式），每分钟最多格式化一次"""
+    now = time.time()
+    if now - _today_cache[0] > 60:
+        _today_cache[:] = [now, datetime.now().strftime('%Y%m%d')]
+    return _today_cache[1]
+
+
+# 股票代码首位 -> 市场代码（沪市为1，深市为0）
+_MKT_PREFIX = {'6': '1', '0': '0', '3': '0'}
+
+
+def _to_secid(stock_code: str) -> Optional[str]:
+    """将股票代码转换为"市场代码.股票代码"格式，不支持的代码返回None"""
+    market = _MKT_PREFIX.get(stock_code[:1])
+    if market is None:
+        return None
+    return f"{market}.{stock_code}"
+
 
 class EastMoneyAPI:
-    BASE_URL = "http://push2.eastmoney.com/api/qt"
+    BASE_URL = _BASE_URL
 
     @staticmethod
-    def get_stock_quote(stock_code: str) -> Optional[Dict]:
+    def get_stock_quote(stock_code: str, use_cache: bool = True) -> Optional[Quote]:
         """
         获取股票实时行情数据
         
@@ -33,7 +162,7 @@ class EastMoneyAPI:
             * f117: 流通市值
             * f168: 换手率（单位：%）
           - ut: 认证参数，固定值
-        - 返回值：包含股票行情信息的字典，已将价格单位转换为元，其他单位保持不变
+        - 返回值：Quote行情对象，已将价格单位转换为元，其他单位保持不变
         - 字段转换说明：价格字段（如f43,f44等）除以100转换为元，其他字段直接使用API返回值
         
         直接点击示例URL：
@@ -42,50 +171,139 @@ class EastMoneyAPI:
         
         Args:
             stock_code: 股票代码，如"600519"（贵州茅台）、"002594"（比亚迪）
+            use_cache: 是否使用短时缓存，False时强制请求最新行情
             
         Returns:
-            包含股票行情信息的字典，失败返回None
+            Quote行情对象（字段名与原字典键相同，可用_asdict()转换为字典），失败返回None
         """
+        if use_cache:
+            cached = _cache_get(_QUOTE_CACHE, stock_code)
+            if cached:
+                return cached
+
         try:
-            if stock_code.startswith('6'):
-                market = '1'
-                full_code = f"1.{stock_code}"
-            elif stock_code.startswith(('0', '3')):
-                market = '0'
-                full_code = f"0.{stock_code}"
-            else:
+            full_code = _to_secid(stock_code)
+            if full_code is None:
                 return None
 
-            url = f"{EastMoneyAPI.BASE_URL}/stock/get"
             params = {
                 'secid': full_code,
-                'fields': 'f43,f44,f45,f46,f47,f48,f49,f50,f51,f52,f57,f58,f60,f107,f116,f117,f168,f169,f170',
+                'fields': _QUOTE_FIELDS,
             }
 
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+            response = _SESSION.get(_QUOTE_URL, params=params, timeout=10)
+            data = orjson.loads(response.content)
 
             if data and data.get('data'):
                 quote_data = data['data']
-                return {
-                    'stock_code': stock_code,
-                    'stock_name': quote_data.get('f58', ''),
-                    'current_price': quote_data.get('f43', 0) / 100,
-                    'open_price': quote_data.get('f46', 0) / 100,
-                    'high_price': quote_data.get('f44', 0) / 100,
-                    'low_price': quote_data.get('f45', 0) / 100,
-                    'pre_close': quote_data.get('f60', 0) / 100,
-                    'volume': quote_data.get('f47', 0),
-                    'amount': quote_data.get('f48', 0),
-                    'change': quote_data.get('f169', 0) / 100,
-                    'change_percent': quote_data.get('f170', 0) / 100,
-                    'timestamp': quote_data.get('f107', 0)
-                }
+                quote = Quote(
+                    stock_code=stock_code,
+                    stock_name=quote_data.get('f58', ''),
+                    current_price=_num(quote_data.get('f43', 0), 100),
+                    open_price=_num(quote_data.get('f46', 0), 100),
+                    high_price=_num(quote_data.get('f44', 0), 100),
+                    low_price=_num(quote_data.get('f45', 0), 100),
+                    pre_close=_num(quote_data.get('f60', 0), 100),
+                    volume=_num(quote_data.get('f47', 0)),
+                    amount=_num(quote_data.get('f48', 0)),
+                    change=_num(quote_data.get('f169', 0), 100),
+                    change_percent=_num(quote_data.get('f170', 0), 100),
+                    timestamp=quote_data.get('f107', 0)
+                )
+                if None in quote:
+                    # 停牌等情况下行情字段为"-"，视为无可用行情
+                    return None
+                _cache_set(_QUOTE_CACHE, stock_code, quote)
+                return quote
             return None
-        except Exception as e:
-            print(f"获取股票行情失败: {e}")
+        except _UPSTREAM_ERRORS as e:
+            logger.warning("获取股票行情失败: %s", e)
             return None
 
+    @staticmethod
+    def get_stock_quotes_batch(stock_codes: List[str], use_cache: bool = True) -> Dict[str, Quote]:
+        """
+        批量获取股票实时行情数据（一次HTTP请求）
+
+        API说明：
+        - URL结构：http://push2.eastmoney.com/api/qt/ulist.np/get?secids={secids}&fields={fields}
+        - 参数说明：
+          - secids: 逗号分隔的完整股票代码列表，格式为"市场代码.股票代码"（沪市为1，深市为0）
+          - fields: 要获取的字段列表，具体含义如下：
+            * f2: 最新价（单位：分）
+            * f3: 涨跌幅（单位：0.01%）
+            * f4: 涨跌额（单位：分）
+            * f5: 成交量（单位：手）
+            * f6: 成交额（单位：元）
+            * f12: 股票编号
+            * f14: 股票名称
+            * f15: 最高价（单位：分）
+            * f16: 最低价（单位：分）
+            * f17: 开盘价（单位：分）
+            * f18: 前收盘价（单位：分）
+            * f124: 时间戳
+        - 返回值：以股票代码为键的字典，每个值与get_stock_quote返回的结构相同
+
+        直接点击示例URL：
+        - 贵州茅台+比亚迪：http://push2.eastmoney.com/api/qt/ulist.np/get?secids=1.600519,0.002594&fields=f2,f3,f4,f5,f6,f12,f14,f15,f16,f17,f18,f124
+
+        Args:
+            stock_codes: 股票代码列表，如["600519", "002594"]
+            use_cache: 是否使用短时缓存，False时强制请求最新行情
+
+        Returns:
+            以股票代码为键的Quote字典，获取失败的股票不包含在结果中
+        """
+        quotes = {}
+        if use_cache:
+            for code in stock_codes:
+                cached = _cache_get(_QUOTE_CACHE, code)
+                if cached:
+                    quotes[code] = cached
+
+        secids = [secid for secid in map(_to_secid, stock_codes) if secid and secid[2:] not in quotes]
+        if not secids:
+            return quotes
+
+        try:
+            params = {
+                'secids': ','.join(secids),
+                'fields': _BATCH_QUOTE_FIELDS,
+            }
+
+            response = _SESSION.get(_BATCH_QUOTE_URL, params=params, timeout=10)
+            data = orjson.loads(response.content)
+
+            if data and data.get('data'):
+                diff = data['data'].get('diff') or []
+                if isinstance(diff, dict):
+                    diff = diff.values()
+                for item in diff:
+                    stock_code = item.get('f12', '')
+                    quote = Quote(
+                        stock_code=stock_code,
+                        stock_name=item.get('f14', ''),
+                        current_price=_num(item.get('f2', 0), 100),
+                        open_price=_num(item.get('f17', 0), 100),
+                        high_price=_num(item.get('f15', 0), 100),
+                        low_price=_num(item.get('f16', 0), 100),
+                        pre_close=_num(item.get('f18', 0), 100),
+                        volume=_num(item.get('f5', 0)),
+                        amount=_num(item.get('f6', 0)),
+                        change=_num(item.get('f4', 0), 100),
+                        change_percent=_num(item.get('f3', 0), 100),
+                        timestamp=item.get('f124', 0)
+                    )
+                    # 停牌等情况下行情字段为"-"，跳过
+                    if None in quote:
+                        continue
+                    quotes[stock_code] = quote
+                    _cache_set(_QUOTE_CACHE, stock_code, quote)
+            return quotes
+        except _UPSTREAM_ERRORS as e:
+            logger.warning("批量获取股票行情失败: %s", e)
+            return quotes
+
     @staticmethod
     def search_stock(keyword: str) -> List[Dict]:
         """
@@ -111,14 +329,13 @@ class EastMoneyAPI:
             包含搜索结果的列表，每个结果是包含股票信息的字典
         """
         try:
-            url = "http://searchapi.eastmoney.com/api/suggest/get"
             params = {
                 'input': keyword,
                 'type': '14',
             }
 
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+            response = _SESSION.get(_SEARCH_URL, params=params, timeout=10)
+            data = orjson.loads(response.content)
 
             if data and data.get('QuotationCodeTable'):
                 results = []
@@ -130,12 +347,12 @@ class EastMoneyAPI:
                     })
                 return results[:10]
             return []
-        except Exception as e:
-            print(f"搜索股票失败: {e}")
+        except _UPSTREAM_ERRORS as e:
+            logger.warning("搜索股票失败: %s", e)
             return []
 
     @staticmethod
-    def get_market_index(index_code: str = '000001') -> Optional[Dict]:
+    def get_market_index(index_code: str = '000001', use_cache: bool = True) -> Optional[Dict]:
         """
         获取市场指数数据
         
@@ -159,38 +376,48 @@ class EastMoneyAPI:
       
         Args:
             index_code: 指数代码，默认为上证指数（000001）
+            use_cache: 是否使用短时缓存，False时强制请求最新行情
             
         Returns:
             包含指数行情信息的字典，失败返回None
         """
+        cache_key = ('index', index_code)
+        if use_cache:
+            cached = _cache_get(_QUOTE_CACHE, cache_key)
+            if cached:
+                return cached
+
         try:
-            url = f"{EastMoneyAPI.BASE_URL}/stock/get"
             params = {
                 'secid': f'1.{index_code}',
-                'fields': 'f43,f44,f45,f46,f60,f170',
+                'fields': _INDEX_FIELDS,
             }
 
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+            response = _SESSION.get(_QUOTE_URL, params=params, timeout=10)
+            data = orjson.loads(response.content)
 
             if data and data.get('data'):
                 quote_data = data['data']
-                return {
+                index = {
                     'index_code': index_code,
-                    'current_price': quote_data.get('f43', 0) / 100,
-                    'open_price': quote_data.get('f46', 0) / 100,
-                    'high_price': quote_data.get('f44', 0) / 100,
-                    'low_price': quote_data.get('f45', 0) / 100,
-                    'pre_close': quote_data.get('f60', 0) / 100,
-                    'change_percent': quote_data.get('f170', 0) / 100
+                    'current_price': _num(quote_data.get('f43', 0), 100),
+                    'open_price': _num(quote_data.get('f46', 0), 100),
+                    'high_price': _num(quote_data.get('f44', 0), 100),
+                    'low_price': _num(quote_data.get('f45', 0), 100),
+                    'pre_close': _num(quote_data.get('f60', 0), 100),
+                    'change_percent': _num(quote_data.get('f170', 0), 100)
                 }
+                if None in index.values():
+                    return None
+                _cache_set(_QUOTE_CACHE, cache_key, index)
+                return index
             return None
-        except Exception as e:
-            print(f"获取指数行情失败: {e}")
+        except _UPSTREAM_ERRORS as e:
+            logger.warning("获取指数行情失败: %s", e)
             return None
     
     @staticmethod
-    def get_stock_history(stock_code: str, period: str = 'day', count: int = 30) -> Optional[List[Dict]]:
+    def get_stock_history(stock_code: str, period: str = 'day', count: int = 30, use_cache: bool = True) -> Optional[List[Dict]]:
         """
         获取股票历史行情数据
         
@@ -214,72 +441,49 @@ class EastMoneyAPI:
             stock_code: 股票代码，如"600519"（贵州茅台）、"002594"（比亚迪）
             period: 周期，可选值：day（日线）、week（周线）、month（月线）
             count: 获取数据条数，默认为30条
+            use_cache: 是否使用短时缓存，False时强制请求最新数据
             
         Returns:
             包含历史K线数据的列表，失败返回None
         """
+        cache_key = ('stock', stock_code, period, count)
+        if use_cache:
+            cached = _cache_get(_HISTORY_CACHE, cache_key)
+            if cached:
+                return cached
+
         try:
-            if stock_code.startswith('6'):
-                market = '1'
-                full_code = f"1.{stock_code}"
-            elif stock_code.startswith(('0', '3')):
-                market = '0'
-                full_code = f"0.{stock_code}"
-            else:
+            full_code = _to_secid(stock_code)
+            if full_code is None:
                 return None
             
-            # 周期映射
-            period_map = {
-                'day': 101,
-                'week': 102,
-                'month': 103
-            }
-            
-            # 设置当前日期为默认结束日期（YYYYMMDD格式）
-            from datetime import datetime
-            current_date = datetime.now().strftime('%Y%m%d')
-            
-            url = f"https://push2his.eastmoney.com/api/qt/stock/kline/get"
             params = {
                 'secid': full_code,
-                'fields1': 'f1,f2,f3,f4,f5,f6',
-                'fields2': 'f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61',
-                'klt': period_map.get(period, 101),
+                'fields1': _KLINE_FIELDS1,
+                'fields2': _KLINE_FIELDS2,
+                'klt': _PERIOD_MAP.get(period, 101),
                 'fqt': 1,  # 前复权
-                'end': current_date,  # 默认为当前日期
+                'end': _today_str(),  # 默认为当前日期
                 'lmt': count
             }
 
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+            response = _SESSION.get(_KLINE_URL, params=params, timeout=10)
+            data = orjson.loads(response.content)
 
             if data and data.get('data'):
                 klines = data['data'].get('klines', [])
-                history_data = []
-                
-                for kline in klines:
-                    parts = kline.split(',')
-                    if len(parts) >= 11:
-                        history_data.append({
-                            'date': parts[0],
-                            'open': float(parts[1]),
-                            'close': float(parts[2]),
-                            'high': float(parts[3]),
-                            'low': float(parts[4]),
-                            'volume': int(parts[5]),
-                            'amount': float(parts[6]),
-                            'change': float(parts[2]) - float(parts[1]),
-                            'change_percent': (float(parts[2]) - float(parts[1])) / float(parts[1]) * 100 if float(parts[1]) > 0 else 0
-                        })
+                history_data = _parse_klines(klines)
                 
+                if history_data:
+                    _cache_set(_HISTORY_CACHE, cache_key, history_data)
                 return history_data
             return []
-        except Exception as e:
-            print(f"获取股票历史数据失败: {e}")
+        except _UPSTREAM_ERRORS as e:
+            logger.warning("获取股票历史数据失败: %s", e)
             return None
     
     @staticmethod
-    def get_index_history(index_code: str = '000001', period: str = 'day', count: int = 30) -> Optional[List[Dict]]:
+    def get_index_history(index_code: str = '000001', period: str = 'day', count: int = 30, use_cache: bool = True) -> Optional[List[Dict]]:
         """
         获取指数历史行情数据
         
@@ -303,59 +507,41 @@ class EastMoneyAPI:
             index_code: 指数代码，默认为上证指数（000001）
             period: 周期，可选值：day（日线）、week（周线）、month（月线）
             count: 获取数据条数，默认为30条
+            use_cache: 是否使用短时缓存，False时强制请求最新数据
             
         Returns:
             包含历史K线数据的列表，失败返回None
         """
+        cache_key = ('index', index_code, period, count)
+        if use_cache:
+            cached = _cache_get(_HISTORY_CACHE, cache_key)
+            if cached:
+                return cached
+
         try:
             full_code = f"1.{index_code}"
             
-            # 周期映射
-            period_map = {
-                'day': 101,
-                'week': 102,
-                'month': 103
-            }
-            
-            # 设置当前日期为默认结束日期（YYYYMMDD格式）
-            from datetime import datetime
-            current_date = datetime.now().strftime('%Y%m%d')
-            
-            url = f"https://push2his.eastmoney.com/api/qt/stock/kline/get"
             params = {
                 'secid': full_code,
-                'fields1': 'f1,f2,f3,f4,f5,f6',
-                'fields2': 'f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61',
-                'klt': period_map.get(period, 101),
+                'fields1': _KLINE_FIELDS1,
+                'fields2': _KLINE_FIELDS2,
+                'klt': _PERIOD_MAP.get(period, 101),
                 'fqt': 0,  # 指数不需要复权
-                'end': current_date,  # 默认为当前日期
+                'end': _today_str(),  # 默认为当前日期
                 'lmt': count
             }
 
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+            response = _SESSION.get(_KLINE_URL, params=params, timeout=10)
+            data = orjson.loads(response.content)
 
             if data and data.get('data'):
                 klines = data['data'].get('klines', [])
-                history_data = []
-                
-                for kline in klines:
-                    parts = kline.split(',')
-                    if len(parts) >= 11:
-                        history_data.append({
-                            'date': parts[0],
-                            'open': float(parts[1]),
-                            'close': float(parts[2]),
-                            'high': float(parts[3]),
-                            'low': float(parts[4]),
-                            'volume': int(parts[5]),
-                            'amount': float(parts[6]),
-                            'change': float(parts[2]) - float(parts[1]),
-                            'change_percent': (float(parts[2]) - float(parts[1])) / float(parts[1]) * 100 if float(parts[1]) > 0 else 0
-                        })
+                history_data = _parse_klines(klines)
                 
+                if history_data:
+                    _cache_set(_HISTORY_CACHE, cache_key, history_data)
                 return history_data
             return []
-        except Exception as e:
-            print(f"获取指数历史数据失败: {e}")
+        except _UPSTREAM_ERRORS as e:
+            logger.warning("获取指数历史数据失败: %s", e)
             return None
\ No newline at end of file
@@ -1,6 +1,9 @@
 from datetime import datetime
 
 class Account:
+    __slots__ = ('initial_capital', 'available_cash', 'total_assets', 'total_profit',
+                 'profit_rate', 'created_at')
+
     def __init__(self, initial_capital):
         self.initial_capital = initial_capital
         self.available_cash = initial_capital
@@ -21,7 +24,9 @@ class Account:
 
     @classmethod
     def from_dict(cls, data):
-        account = cls(data['initial_capital'])
+        # 跳过__init__，所有字段都来自data，无需先生成默认值和创建时间
+        account = cls.__new__(cls)
+        account.initial_capital = data['initial_capital']
         account.available_cash = data['available_cash']
         account.total_assets = data['total_assets']
         account.total_profit = data['total_profit']
@@ -30,6 +35,9 @@ class Account:
         return account
 
 class Position:
+    __slots__ = ('stock_code', 'stock_name', 'shares', 'cost_price', '_cost_amount', '_inv_cost',
+                 'current_price', 'market_value', 'profit', 'profit_rate')
+
     def __init__(self, stock_code, stock_name, shares, cost_price):
         self.stock_code = stock_code
         self.stock_name = stock_name
@@ -41,11 +49,21 @@ class Position:
         self.profit = 0.0
         self.profit_rate = 0.0
 
+    @property
+    def cost_amount(self):
+        return self._cost_amount
+
+    @cost_amount.setter
+    def cost_amount(self, value):
+        self._cost_amount = value
+        # 缓存 100/成本金额，行情刷新时用乘法代替除法和零值判断
+        self._inv_cost = 100.0 / value if value > 0 else 0.0
+
     def update_price(self, current_price):
         self.current_price = current_price
         self.market_value = self.shares * current_price
-        self.profit = self.market_value - self.cost_amount
-        self.profit_rate = (self.profit / self.cost_amount) * 100 if self.cost_amount > 0 else 0
+        self.profit = self.market_value - self._cost_amount
+        self.profit_rate = self.profit * self._inv_cost
 
     def to_dict(self):
         return {
@@ -62,7 +80,11 @@ class Position:
 
     @classmethod
     def from_dict(cls, data):
-        position = cls(data['stock_code'], data['stock_name'], data['shares'], data['cost_price'])
+        position = cls.__new__(cls)
+        position.stock_code = data['stock_code']
+        position.stock_name = data['stock_name']
+        position.shares = data['shares']
+        position.cost_price = data['cost_price']
         position.cost_amount = data['cost_amount']
         position.current_price = data['current_price']
         position.market_value = data['market_value']
@@ -71,6 +93,9 @@ class Position:
         return position
 
 class Trade:
+    __slots__ = ('trade_type', 'stock_code', 'stock_name', 'shares', 'price', 'amount',
+                 'commission', 'total_amount', 'created_at')
+
     def __init__(self, trade_type, stock_code, stock_name, shares, price, amount, commission):
         self.trade_type = trade_type  # 'buy' or 'sell'
         self.stock_code = stock_code
@@ -97,8 +122,44 @@ class Trade:
 
     @classmethod
     def from_dict(cls, data):
-        trade = cls(data['trade_type'], data['stock_code'], data['stock_name'],
-                   data['shares'], data['price'], data['amount'], data['commission'])
+        # 加载交易记录时跳过__init__，避免为每条记录调用datetime.now()和重算总金额
+        trade = cls.__new__(cls)
+        trade.trade_type = data['trade_type']
+        trade.stock_code = data['stock_code']
+        trade.stock_name = data['stock_name']
+        trade.shares = data['shares']
+        trade.price = data['price']
+        trade.amount = data['amount']
+        trade.commission = data['commission']
         trade.total_amount = data['total_amount']
         trade.created_at = data['created_at']
         return trade
+
+class StrategyResult:
+    __slots__ = ('stock_code', 'stock_name', 'current_price', 'strategy_type', 'signal', 'reason',
+                 'calculation_steps', 'indicators', 'error')
+
+    def __init__(self, stock_code, stock_name, current_price, strategy_type,
+                 signal='hold', reason='', calculation_steps=None, indicators=None, error=None):
+        self.stock_code = stock_code
+        self.stock_name = stock_name
+        self.current_price = current_price
+        self.strategy_type = strategy_type
+        self.signal = signal  # 'buy', 'sell' or 'hold'
+        self.reason = reason
+        self.calculation_steps = calculation_steps if calculation_steps is not None else []
+        self.indicators = indicators if indicators is not None else {}
+        self.error = error  # 分析失败（如无法获取行情）时的错误信息，成功时为None
+
+    def to_dict(self):
+        return {
+            'stock_code': self.stock_code,
+            'stock_name': self.stock_name,
+            'current_price': self.current_price,
+            'strategy_type': self.strategy_type,
+            'signal': self.signal,
+            'reason': self.reason,
+            'calculation_steps': self.calculation_steps,
+            'indicators': self.indicators,
+            'error': self.error
+        }
@@ -24,58 +24,614 @@
 
 所有计算均遵循标准金融指标公式，确保计算准确性
 """
-import pandas as pd
+import functools
+import inspect
+import logging
 import numpy as np
-from .eastmoney_api import EastMoneyAPI
+import threading
+from cachetools import TTLCache
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from .eastmoney_api import EastMoneyAPI, Quote
+from .models import StrategyResult
+from ._kernels import (A9, A12, A26, BATCH_COLUMNS,
+                       batch_indicators, bb_kernel, ma_kernel, macd_kernel, rsi_kernel, warmup)
+
+logger = logging.getLogger(__name__)
+
+# 并发请求行情和历史数据的线程池
+_IO_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# 信号原因模板：只对最终选中的分支代入数值
+_MOMENTUM_REASONS = {
+    'strong_buy': '强势涨停{:.2f}%，放量突破，建议买入',
+    'buy': '上涨{:.2f}%，动能强劲，建议买入',
+    'strong_sell': '大幅下跌{:.2f}%，风险极大，建议卖出',
+    'sell': '下跌{:.2f}%，动能转弱，建议卖出',
+    'hold': '波动较小，动能不足，建议观望'
+}
+
+_VOLUME_REASONS = {
+    'high_up': '放量上涨（成交量{:.1f}倍），资金流入明显，建议买入',
+    'high_down': '放量下跌（成交量{:.1f}倍），资金流出明显，建议卖出',
+    'low': '成交量萎缩，缺乏方向，建议观望',
+    'moderate_up': '温和放量上涨，趋势向好，建议买入',
+    'normal': '成交量正常，建议观望'
+}
+
+_RSI_REASONS = {
+    'oversold_drop': 'RSI超卖（{:.1f}），可能反弹，建议买入',
+    'oversold': 'RSI超卖（{:.1f}），建议买入',
+    'overbought_rise': 'RSI超买（{:.1f}），可能回调，建议卖出',
+    'overbought': 'RSI超买（{:.1f}），建议卖出',
+    'low': 'RSI偏低（{:.1f}），考虑买入',
+    'high': 'RSI偏高（{:.1f}），考虑卖出',
+    'neutral': 'RSI中性（{:.1f}），建议观望'
+}
+
+def _macd_decide(dif_above_zero, dea_above_zero, dif_above_dea, strong_rise):
+    """MACD信号判定规则，仅用于生成_MACD_DECISION查找表"""
+    if dif_above_zero and dea_above_zero and dif_above_dea:
+        if strong_rise:
+            return 'buy', 'MACD金叉向上，多头排列，建议买入'
+        return 'buy', 'MACD在零轴上方，多头趋势，建议买入'
+    if not dif_above_zero and not dea_above_zero and not dif_above_dea:
+        return 'sell', 'MACD死叉向下，空头排列，建议卖出'
+    if dif_above_zero and not dea_above_zero:
+        return 'buy', 'MACD金叉，趋势反转向上，建议买入'
+    if not dif_above_zero and dea_above_zero:
+        return 'sell', 'MACD死叉，趋势反转向下，建议卖出'
+    return 'hold', 'MACD信号不明确，建议观望'
+
+
+def _bollinger_decide(above_upper, below_lower, above_ma20, wide, narrow):
+    """布林带信号判定规则，仅用于生成_BOLLINGER_DECISION查找表"""
+    if above_upper:
+        return 'sell', '股价突破上轨，超买信号，建议卖出'
+    if below_lower:
+        return 'buy', '股价跌破下轨，超卖信号，建议买入'
+    if above_ma20 and wide:
+        return 'buy', '股价在中轨上方，布林带开口，建议买入'
+    if not above_ma20 and wide:
+        return 'sell', '股价在中轨下方，布林带开口，建议卖出'
+    if narrow:
+        return 'hold', '布林带收窄，等待突破，建议观望'
+    return 'hold', '股价在中轨附近，建议观望'
+
+
+def _decision_table(decide, nbits: int) -> tuple:
+    """枚举全部条件组合生成 (signal, reason) 查找表，第一个条件对应最高位"""
+    return tuple(decide(*(bool(mask >> bit & 1) for bit in range(nbits - 1, -1, -1)))
+                 for mask in range(1 << nbits))
+
+
+# 信号判定查找表：运行时把各条件拼成位掩码，一次下标访问得到信号和原因
+_MACD_DECISION = _decision_table(_macd_decide, 4)
+_BOLLINGER_DECISION = _decision_table(_bollinger_decide, 5)
+
+# 布林带策略各计算步骤的固定字段（只读），生成步骤时只填入数值部分
+# 值为None的键是占位符，保证合并后的键顺序与模板一致
+_BOLL_STEP_TEMPLATES = (
+    {'step': 1, 'name': '获取基础数据', 'description': '从API获取股票的价格数据', 'data': None},
+    {'step': 2, 'name': '计算中轨', 'description': '计算20日移动平均线（中轨）',
+     'formula': 'MA20 = 20日收盘价的平均值', 'results': None},
+    {'step': 3, 'name': '计算标准差', 'description': '计算20日收盘价的标准差',
+     'formula': 'std = sqrt(平均(每个收盘价-MA20)^2)', 'results': None},
+    {'step': 4, 'name': '计算上下轨', 'description': '计算布林带的上轨和下轨',
+     'formulas': {'upper_band': 'MA20 + 2 * std', 'lower_band': 'MA20 - 2 * std'}, 'results': None},
+    {'step': 5, 'name': '计算带宽', 'description': '计算布林带的带宽，衡量价格波动范围',
+     'formula': 'bandwidth = (upper_band - lower_band) / MA20 * 100', 'result': None},
+    {'step': 6, 'name': '分析布林带状态', 'description': '分析当前价格与布林带的位置关系', 'analysis': None},
+    {'step': 7, 'name': '生成最终信号', 'description': '根据布林带状态生成最终的买卖信号',
+     'signal': None, 'reason': None},
+)
+
+# 各策略所需的最少历史数据条数，不足时直接返回观望
+_MIN_HISTORY = {'ma': 20, 'macd': 26, 'rsi': 15, 'bollinger': 20}
+
+# Numba默认的workqueue线程层不支持多个线程同时启动并行内核，批量计算需串行进入
+_BATCH_LOCK = threading.Lock()
+
+
+_EMPTY_ARRAY = np.empty(0, dtype=np.float64)
+
+
+class HistoryArrays(NamedTuple):
+    """历史K线的列式存储：每个字段为按日期排列的连续float64数组（日期为字符串元组）"""
+    dates: tuple
+    opens: np.ndarray
+    highs: np.ndarray
+    lows: np.ndarray
+    closes: np.ndarray
+    volumes: np.ndarray
+
+
+def _history_arrays(history_data: list) -> HistoryArrays:
+    """
+    将历史K线（字典列表）一次性转换为按字段连续存储的数组
+
+    Returns:
+        HistoryArrays，无历史数据时返回None
+    """
+    if not history_data:
+        return None
+    n = len(history_data)
+    return HistoryArrays(
+        dates=tuple(item.get('date', '') for item in history_data),
+        opens=np.fromiter((item.get('open', item['close']) for item in history_data), dtype=np.float64, count=n),
+        highs=np.fromiter((item.get('high', item['close']) for item in history_data), dtype=np.float64, count=n),
+        lows=np.fromiter((item.get('low', item['close']) for item in history_data), dtype=np.float64, count=n),
+        closes=np.fromiter((item['close'] for item in history_data), dtype=np.float64, count=n),
+        volumes=np.fromiter((item.get('volume', 0) for item in history_data), dtype=np.float64, count=n)
+    )
+
+
+def _closes_array(hist) -> np.ndarray:
+    """取出收盘价数组，兼容直接传入历史K线列表的调用方"""
+    if not hist:
+        return _EMPTY_ARRAY
+    if not isinstance(hist, HistoryArrays):
+        hist = _history_arrays(hist)
+    return hist.closes
+
+
+def _history_key(hist) -> tuple:
+    """历史数据的标识：条数、最后交易日、最后收盘价"""
+    if not hist:
+        return (0, None, None)
+    if isinstance(hist, HistoryArrays):
+        return (len(hist.closes), hist.dates[-1], float(hist.closes[-1]))
+    last = hist[-1]
+    return (len(hist), last.get('date'), last['close'])
+
+
+# 策略结果中保留4位小数的指标，其余浮点数保留2位
+_ROUND_DIGITS = {'DIF': 4, 'DEA': 4, 'MACD_bar': 4, 'MACD柱状图': 4, 'avg_gain': 4, 'avg_loss': 4, 'RS': 4}
+
+
+def _round_result_tree(obj, ndigits: int = 2):
+    """
+    递归保留策略结果中浮点数的小数位，键在_ROUND_DIGITS中的按其指定位数
+
+    策略内部使用未取舍的浮点数，由_run_strategy在生成StrategyResult时统一处理一次。
+    """
+    if isinstance(obj, float):
+        return round(float(obj), ndigits)
+    if isinstance(obj, dict):
+        return {k: _round_result_tree(v, _ROUND_DIGITS.get(k, ndigits)) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_round_result_tree(v, ndigits) for v in obj]
+    return obj
+
+
+# 每个策略最多记忆的结果数，超出后按加入顺序淘汰
+_MEMO_SIZE = 512
+
+
+def _copy_tree(obj):
+    """复制策略结果中的字典和列表，缓存中的结果不会被调用方的修改影响"""
+    if isinstance(obj, dict):
+        return {k: _copy_tree(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_copy_tree(v) for v in obj]
+    return obj
+
+
+def _memoize_strategy(func):
+    """
+    策略结果记忆化
+
+    以(行情, 历史数据条数、最后交易日、最后收盘价, explain)为键缓存策略结果，同一行情下
+    重复分析同一股票时直接返回上次的结果。Quote不可变且包含策略用到的全部行情字段，
+    可直接作为键；行情或K线变化后键随之变化。ind由历史数据计算而来，不参与键。
+    explain为None时在这里替换为引擎的默认值（StrategyEngine的verbose），再传给策略。
+    缓存保存在引擎实例上（StrategyEngine._memo），不同引擎之间互不共享；
+    每次返回缓存结果的副本，调用方修改返回值不影响之后的命中。
+    """
+    name = func.__name__
+    # explain是策略方法的最后一个参数，记录其位置（不含self）以免每次调用都绑定签名
+    explain_index = list(inspect.signature(func).parameters).index('explain') - 1
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        quote = args[0] if args else kwargs['quote']
+        hist = args[1] if len(args) > 1 else kwargs.get('hist')
+        if len(args) > explain_index:
+            explain = args[explain_index]
+            args = args[:explain_index]
+        else:
+            explain = kwargs.pop('explain', None)
+        if explain is None:
+            explain = self._explain
+        key = (quote, _history_key(hist), explain)
+        cache = self._memo.setdefault(name, {})
+
+        with self._memo_lock:
+            result = cache.get(key)
+        if result is None:
+            result = func(self, *args, explain=explain, **kwargs)
+            with self._memo_lock:
+                if len(cache) >= _MEMO_SIZE:
+                    cache.pop(next(iter(cache)))
+                cache[key] = result
+        return _copy_tree(result)
+
+    return wrapper
+
+
+def _insufficient_history(explain: bool) -> dict:
+    """历史数据不足时的策略结果"""
+    return {
+        'signal': 'hold',
+        'reason': '历史数据不足，建议观望',
+        'calculation_steps': [] if explain else None,
+        'indicators': {}
+    }
+
+
+def _batch_indicators(hists: list) -> list:
+    """
+    对多只股票的历史数组批量计算技术指标
+
+    Returns:
+        与hists顺序一致的列表，每项为{BATCH_COLUMNS列名: 值}，无历史数据时为None
+    """
+    lengths = np.array([len(_closes_array(h)) for h in hists], dtype=np.int64)
+    valid = np.flatnonzero(lengths)
+    results = [None] * len(hists)
+    if len(valid) == 0:
+        return results
+
+    # 按最长历史对齐为二维矩阵，每行前lengths[i]个元素有效
+    closes = np.zeros((len(valid), int(lengths.max())))
+    for row, i in enumerate(valid):
+        closes[row, :lengths[i]] = _closes_array(hists[i])
+    out = np.empty((len(valid), len(BATCH_COLUMNS)))
+    with _BATCH_LOCK:
+        batch_indicators(closes, np.ascontiguousarray(lengths[valid]), out)
+
+    for row, i in enumerate(valid):
+        results[i] = dict(zip(BATCH_COLUMNS, out[row].tolist()))
+    return results
+
+
+class IndicatorState:
+    """
+    单只股票的增量指标状态
+
+    以历史收盘价初始化后，每个新收盘价只需O(1)更新EMA12/EMA26/DEA、
+    RSI的平均涨跌金额以及最近20日窗口的均值与离差平方和（Welford算法），无需重算整段历史。
+    递推规则与_kernels中的批量计算一致。
+
+    同时记录最后一根K线的交易日和加入它之前的状态（prev），同一交易日的价格
+    再次到达时先回退到prev再重新加入，因此盘中反复更新当日价格也只需O(1)。
+    """
+    __slots__ = ('count', 'last_close', 'last_date', 'ema_fast', 'ema_slow', 'dea',
+                 'avg_gain', 'avg_loss', 'mean_w', 'm2_w', 'window', 'prev')
+
+    RSI_PERIOD = 14
+    WINDOW = 20
+
+    def __init__(self, closes: np.ndarray = None):
+        self.count = 0
+        self.last_close = 0.0
+        self.last_date = None
+        self.ema_fast = 0.0
+        self.ema_slow = 0.0
+        self.dea = 0.0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.mean_w = 0.0
+        self.m2_w = 0.0
+        self.window = deque(maxlen=self.WINDOW)
+        self.prev = None
+        if closes is not None and len(closes) > 0:
+            self._seed(closes)
+
+    @classmethod
+    def from_history(cls, hist: HistoryArrays) -> 'IndicatorState':
+        """用历史K线初始化，最后一根K线通过update加入，以便当日价格可以修正"""
+        state = cls(hist.closes[:-1])
+        state.update(hist.closes[-1], hist.dates[-1])
+        return state
+
+    def copy(self) -> 'IndicatorState':
+        """复制当前状态（不含prev）"""
+        other = IndicatorState.__new__(IndicatorState)
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        other.window = deque(self.window, maxlen=self.WINDOW)
+        other.prev = None
+        return other
+
+    def _restore(self, other: 'IndicatorState'):
+        for name in self.__slots__:
+            setattr(self, name, getattr(other, name))
+
+    def _seed(self, closes: np.ndarray):
+        """用历史收盘价一次性初始化状态"""
+        ema12, ema26, _, dea = macd_kernel(closes)
+        _, avg_gain, avg_loss, _, _ = rsi_kernel(closes, self.RSI_PERIOD)
+        self.count = len(closes)
+        self.last_close = float(closes[-1])
+        self.ema_fast = float(ema12)
+        self.ema_slow = float(ema26)
+        self.dea = float(dea)
+        self.avg_gain = float(avg_gain)
+        self.avg_loss = float(avg_loss)
+        recent = closes[-self.WINDOW:]
+        self.window.extend(recent.tolist())
+        self.mean_w = float(recent.mean())
+        deviations = recent - self.mean_w
+        self.m2_w = float(np.dot(deviations, deviations))
+
+    def update(self, close: float, date: str = None):
+        """
+        加入一个收盘价
+
+        Args:
+            close: 收盘价
+            date: 所属交易日；与最后一根K线的交易日相同时视为对该K线价格的修正
+        """
+        close = float(close)
+        if date is not None and date == self.last_date and self.prev is not None:
+            self._restore(self.prev)
+        self.prev = self.copy()
+
+        if self.count == 0:
+            self.ema_fast = close
+            self.ema_slow = close
+        else:
+            self.ema_fast += A12 * (close - self.ema_fast)
+            self.ema_slow += A26 * (close - self.ema_slow)
+            dif = self.ema_fast - self.ema_slow
+            # DEA以第二个交易日的DIF为初始值
+            self.dea = dif if self.count == 1 else self.dea + A9 * (dif - self.dea)
+
+            # 价格变动数不足14个时取简单平均，之后按Wilder平滑
+            change = close - self.last_close
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            m = self.count if self.count <= self.RSI_PERIOD else self.RSI_PERIOD
+            self.avg_gain = (self.avg_gain * (m - 1) + gain) / m
+            self.avg_loss = (self.avg_loss * (m - 1) + loss) / m
+
+        # 滑动窗口（Welford算法）：窗口未满时加入新值，已满时用新值替换最早的收盘价
+        k = len(self.window)
+        if k < self.WINDOW:
+            delta = close - self.mean_w
+            self.mean_w += delta / (k + 1)
+            self.m2_w += delta * (close - self.mean_w)
+        else:
+            oldest = self.window[0]
+            old_mean = self.mean_w
+            self.mean_w += (close - oldest) / k
+            self.m2_w += (close - oldest) * (close - self.mean_w + oldest - old_mean)
+        self.window.append(close)
+
+        self.count += 1
+        self.last_close = close
+        self.last_date = date
+
+    def snapshot(self) -> dict:
+        """返回当前各指标的值"""
+        dif = self.ema_fast - self.ema_slow
+
+        tot = self.avg_gain + self.avg_loss
+        rsi = 50.0 if tot == 0 else 100 * self.avg_gain / tot
+
+        k = len(self.window)
+        ma20 = self.mean_w
+        var = self.m2_w / k if k else 0.0
+        std = var ** 0.5 if var > 0 else 0.0
+
+        return {
+            'count': self.count,
+            'date': self.last_date,
+            'close': self.last_close,
+            'EMA12': self.ema_fast,
+            'EMA26': self.ema_slow,
+            'DIF': dif,
+            'DEA': self.dea,
+            'MACD_bar': 2 * (dif - self.dea),
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss,
+            'RSI': rsi,
+            'MA20': ma20,
+            'std': std,
+            'upper_band': ma20 + 2 * std,
+            'lower_band': ma20 - 2 * std
+        }
+
 
 class StrategyEngine:
-    def __init__(self):
+    def __init__(self, verbose: bool = False):
+        """
+        Args:
+            verbose: 是否默认生成详细的计算过程（calculation_steps）。
+                     回测、批量筛选等场景保持关闭，仅在需要展示计算过程时开启；
+                     单次调用可通过explain参数覆盖
+        """
         self.api = EastMoneyAPI()
+        self._explain = verbose
+        # 已转换为数组的60日历史数据，同一股票的不同策略共用一次获取和转换
+        self._hist_cache = TTLCache(maxsize=512, ttl=60)
+        self._hist_lock = threading.Lock()
+        # 各股票的增量指标状态，供stream_update使用
+        self._state = {}
+        # 策略结果记忆化缓存（见_memoize_strategy）：策略名 -> {键: 结果}
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+        # 构造时预先调用一次各指标内核，首个分析请求不再承担编译缓存加载和并行线程池启动的开销
+        try:
+            with _BATCH_LOCK:
+                warmup()
+        except Exception as e:
+            logger.warning("指标内核预热失败: %s", e)
 
-    def analyze(self, stock_code: str, strategy_type: str = 'ma'):
+    def analyze(self, stock_code: str, strategy_type: str = 'ma', explain: bool = None):
         """
         执行策略分析
         
         Args:
             stock_code: 股票代码
             strategy_type: 策略类型，可选值：ma, momentum, volume, macd, rsi, bollinger
+            explain: 是否生成详细的计算过程（calculation_steps），默认取引擎的verbose设置
             
         Returns:
-            包含策略分析结果和计算过程的字典
+            StrategyResult（策略分析结果和计算过程），获取行情失败时其error字段为错误信息
         """
-        quote = self.api.get_stock_quote(stock_code)
+        # 实时行情与历史数据（60天，用于技术指标计算）互不依赖，并发获取
+        quote_future = _IO_EXECUTOR.submit(self.api.get_stock_quote, stock_code)
+        history_future = _IO_EXECUTOR.submit(self._get_hist, stock_code)
+
+        quote = quote_future.result()
         if not quote:
-            return {'error': '无法获取股票数据'}
-        
-        # 获取历史数据用于技术指标计算
-        history_data = self.api.get_stock_history(stock_code, 'day', 60)  # 获取60天历史数据
-
-        result = {
-            'stock_code': stock_code,
-            'stock_name': quote['stock_name'],
-            'current_price': quote['current_price'],
-            'strategy_type': strategy_type,
-            'signal': 'hold',
-            'reason': '',
-            'calculation_steps': []  # 添加计算过程字段
-        }
+            return StrategyResult(stock_code, '', None, strategy_type, error='无法获取股票数据')
+        
+        hist = history_future.result()
+
+        return self._run_strategy(stock_code, strategy_type, quote, hist, explain=explain)
+
+    def analyze_batch(self, stock_codes: list, strategy_type: str = 'ma', explain: bool = None) -> list:
+        """
+        批量执行策略分析
+        
+        行情通过一次批量请求获取，历史数据并发获取，技术指标由并行内核一次算出。
+        
+        Args:
+            stock_codes: 股票代码列表
+            strategy_type: 策略类型，同analyze
+            explain: 是否生成详细的计算过程，同analyze
+            
+        Returns:
+            与stock_codes顺序一致的结果列表，每项与analyze的返回值相同（StrategyResult）
+        """
+        history_futures = [_IO_EXECUTOR.submit(self._get_hist, code) for code in stock_codes]
+        quotes = self.api.get_stock_quotes_batch(stock_codes)
+        missing_codes = [code for code in stock_codes if code not in quotes]
+        if missing_codes:
+            # 批量接口未返回的股票逐只补取
+            for code, quote in zip(missing_codes, _IO_EXECUTOR.map(self.api.get_stock_quote, missing_codes)):
+                if quote:
+                    quotes[code] = quote
+
+        hists = [future.result() for future in history_futures]
+        indicators = _batch_indicators(hists)
+
+        results = []
+        for code, hist, ind in zip(stock_codes, hists, indicators):
+            quote = quotes.get(code)
+            if not quote:
+                results.append(StrategyResult(code, '', None, strategy_type, error='无法获取股票数据'))
+                continue
+            results.append(self._run_strategy(code, strategy_type, quote, hist, ind, explain))
+        return results
+
+    def _run_strategy(self, stock_code: str, strategy_type: str, quote: Quote, hist: HistoryArrays,
+                      ind: dict = None, explain: bool = None) -> StrategyResult:
+        """按策略类型生成分析结果，ind为批量预计算的指标（可选）"""
+        result = StrategyResult(stock_code, quote.stock_name, quote.current_price, strategy_type)
 
         if strategy_type == 'ma':
-            result.update(self.ma_strategy(quote, history_data))
+            output = self.ma_strategy(quote, hist, ind, explain)
         elif strategy_type == 'momentum':
-            result.update(self.momentum_strategy(quote, history_data))
+            output = self.momentum_strategy(quote, hist, explain=explain)
         elif strategy_type == 'volume':
-            result.update(self.volume_strategy(quote, history_data))
+            output = self.volume_strategy(quote, hist, explain=explain)
         elif strategy_type == 'macd':
-            result.update(self.macd_strategy(quote, history_data))
+            output = self.macd_strategy(quote, hist, ind, explain)
         elif strategy_type == 'rsi':
-            result.update(self.rsi_strategy(quote, history_data))
+            output = self.rsi_strategy(quote, hist, ind, explain)
         elif strategy_type == 'bollinger':
-            result.update(self.bollinger_strategy(quote, history_data))
+            output = self.bollinger_strategy(quote, hist, ind, explain)
+        else:
+            return result
 
+        output = _round_result_tree(output)
+        result.signal = output['signal']
+        result.reason = output['reason']
+        result.calculation_steps = output['calculation_steps']
+        result.indicators = output['indicators']
         return result
 
-    def ma_strategy(self, quote: dict, history_data: list = None) -> dict:
+    def _get_hist(self, stock_code: str) -> HistoryArrays:
+        """获取60日历史数据的数组形式（带缓存），获取失败时返回None且不缓存"""
+        key = (stock_code, 'day', 60)
+        with self._hist_lock:
+            bundle = self._hist_cache.get(key)
+        if bundle is None:
+            bundle = _history_arrays(self.api.get_stock_history(stock_code, 'day', 60))
+            if bundle is not None:
+                with self._hist_lock:
+                    self._hist_cache[key] = bundle
+        return bundle
+
+    def stream_update(self, stock_code: str, close: float, date: str = None) -> dict:
+        """
+        以一个新的收盘价增量更新股票的指标
+
+        首次调用时用60日历史数据初始化状态，之后每次调用只做O(1)更新。
+
+        Args:
+            stock_code: 股票代码
+            close: 最新价格
+            date: 价格所属交易日（YYYY-MM-DD）。与上次相同时修正当日K线，晚于上次时追加新K线；
+                  早于上次时说明状态已不连续，先用最新历史数据重新初始化，再按同样规则应用本次价格，
+                  若它仍早于历史数据的最后交易日则丢弃（历史中已有更新的K线）。不传时总是追加
+
+        Returns:
+            更新后的指标值（EMA12、EMA26、DIF、DEA、RSI、MA20、std等）
+        """
+        state = self._state.get(stock_code)
+        if state is None:
+            state = self._seed_state(stock_code, self._get_hist(stock_code))
+        elif date is not None and state.last_date is not None and date < state.last_date:
+            state = self._seed_state(stock_code, self._get_hist(stock_code))
+            if state.last_date is not None and date < state.last_date:
+                return state.snapshot()
+        state.update(close, date)
+        return state.snapshot()
+
+    def sync_history(self, stock_code: str, hist) -> dict:
+        """
+        用一段历史K线同步股票的增量指标状态
+
+        - 最后一根K线与状态的最后交易日相同：修正当日价格
+        - 倒数第二根K线与状态的最后交易日相同：追加最后一根K线
+        - 其他情况（首次同步、跳过了交易日等）：用这段历史重新初始化
+
+        Args:
+            stock_code: 股票代码
+            hist: HistoryArrays或历史K线列表
+
+        Returns:
+            同步后的指标值
+        """
+        if hist is not None and not isinstance(hist, HistoryArrays):
+            hist = _history_arrays(hist)
+        if not hist:
+            state = self._state.get(stock_code)
+            return state.snapshot() if state else {}
+
+        state = self._state.get(stock_code)
+        last_date = state.last_date if state else None
+        if last_date is not None and (last_date == hist.dates[-1] or
+                                      (len(hist.dates) >= 2 and last_date == hist.dates[-2])):
+            state.update(hist.closes[-1], hist.dates[-1])
+        else:
+            state = self._seed_state(stock_code, hist)
+        return state.snapshot()
+
+    def _seed_state(self, stock_code: str, hist: HistoryArrays) -> IndicatorState:
+        """用历史数据（重新）初始化股票的增量状态"""
+        state = IndicatorState.from_history(hist) if hist else IndicatorState()
+        self._state[stock_code] = state
+        return state
+
+    @_memoize_strategy
+    def ma_strategy(self, quote: Quote, hist: HistoryArrays = None, ind: dict = None, explain: bool = None) -> dict:
         """
         移动平均线策略
         
@@ -88,7 +644,8 @@ class StrategyEngine:
         - current_price: 当前价格
         - pre_close: 前收盘价
         - change_percent: 涨跌幅
-        - history_data: 历史收盘价数据，用于计算移动平均线
+        - hist: 历史数据数组（hist.closes为收盘价），用于计算移动平均线
+        - ind: 批量预计算的指标（可选，由analyze_batch提供，提供时不再重复计算）
         
         数据计算方法：
         - MA5: 5日移动平均线 = 最近5天收盘价的简单平均
@@ -100,74 +657,73 @@ class StrategyEngine:
         - 买入：当前价格 > MA5 > MA10 > MA20
         - 卖出：当前价格 < MA5 < MA10
         - 卖出：MA5 < MA10 < MA20（空头排列）
+        - 持有：历史数据不足20天（无法计算MA20）
         - 持有：其他情况
         """
-        current_price = quote['current_price']
-        pre_close = quote['pre_close']
-        change_percent = quote['change_percent']
+        current_price = quote.current_price
+        pre_close = quote.pre_close
+        change_percent = quote.change_percent
         
-        # 记录计算过程
+        # 记录计算过程（explain为False时不生成，返回None）
         calculation_steps = []
         
         # 步骤1：获取基础数据
-        calculation_steps.append({
-            'step': 1,
-            'name': '获取基础数据',
-            'description': '从API获取股票的基础行情数据',
-            'data': {
-                'current_price': current_price,
-                'pre_close': pre_close,
-                'change_percent': change_percent
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 1,
+                'name': '获取基础数据',
+                'description': '从API获取股票的基础行情数据',
+                'data': {
+                    'current_price': current_price,
+                    'pre_close': pre_close,
+                    'change_percent': change_percent
+                }
+            })
         
         # 步骤2：获取历史数据
-        closes = []
-        if history_data and len(history_data) > 0:
-            closes = [item['close'] for item in history_data]  # 获取所有历史收盘价
+        closes = _closes_array(hist)  # 获取所有历史收盘价
+        if len(closes) < _MIN_HISTORY['ma']:
+            return _insufficient_history(explain)
         
         # 步骤3：计算移动平均线
-        # 使用真实历史数据计算移动平均线（如果有足够的数据）
-        ma5 = current_price
-        ma10 = current_price
-        ma20 = current_price
-        
-        if len(closes) >= 5:
-            ma5 = sum(closes[-5:]) / 5
-        if len(closes) >= 10:
-            ma10 = sum(closes[-10:]) / 10
-        if len(closes) >= 20:
-            ma20 = sum(closes[-20:]) / 20
-        
-        calculation_steps.append({
-            'step': 3,
-            'name': '计算移动平均线',
-            'description': '根据历史收盘价计算不同周期的移动平均线',
-            'formulas': {
-                'MA5': '最近5天收盘价的简单平均',
-                'MA10': '最近10天收盘价的简单平均',
-                'MA20': '最近20天收盘价的简单平均'
-            },
-            'results': {
-                'MA5': round(ma5, 2),
-                'MA10': round(ma10, 2),
-                'MA20': round(ma20, 2)
-            }
-        })
+        # 上面已保证至少有20天数据，三条均线均由真实历史数据算出
+        if ind is not None:
+            mas = (ind['MA5'], ind['MA10'], ind['MA20'])
+        else:
+            mas = ma_kernel(closes)
+        ma5, ma10, ma20 = (float(x) for x in mas)
+        
+        if explain:
+            calculation_steps.append({
+                'step': 3,
+                'name': '计算移动平均线',
+                'description': '根据历史收盘价计算不同周期的移动平均线',
+                'formulas': {
+                    'MA5': '最近5天收盘价的简单平均',
+                    'MA10': '最近10天收盘价的简单平均',
+                    'MA20': '最近20天收盘价的简单平均'
+                },
+                'results': {
+                    'MA5': ma5,
+                    'MA10': ma10,
+                    'MA20': ma20
+                }
+            })
         
         # 步骤3：判断均线位置关系
-        calculation_steps.append({
-            'step': 3,
-            'name': '判断均线位置关系',
-            'description': '分析当前价格与各均线的位置关系',
-            'analysis': {
-                'current_price > MA5': current_price > ma5,
-                'current_price > MA10': current_price > ma10,
-                'current_price > MA20': current_price > ma20,
-                'MA5 > MA10': ma5 > ma10,
-                'MA10 > MA20': ma10 > ma20
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 3,
+                'name': '判断均线位置关系',
+                'description': '分析当前价格与各均线的位置关系',
+                'analysis': {
+                    'current_price > MA5': current_price > ma5,
+                    'current_price > MA10': current_price > ma10,
+                    'current_price > MA20': current_price > ma20,
+                    'MA5 > MA10': ma5 > ma10,
+                    'MA10 > MA20': ma10 > ma20
+                }
+            })
         
         # 步骤4：生成买卖信号
         signal = 'hold'
@@ -190,26 +746,28 @@ class StrategyEngine:
             signal = 'hold'
             reason = '股价在均线附近震荡，建议观望'
         
-        calculation_steps.append({
-            'step': 4,
-            'name': '生成买卖信号',
-            'description': '根据均线位置关系和涨跌幅生成最终的买卖信号',
-            'signal': signal,
-            'reason': reason
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 4,
+                'name': '生成买卖信号',
+                'description': '根据均线位置关系和涨跌幅生成最终的买卖信号',
+                'signal': signal,
+                'reason': reason
+            })
         
         return {
             'signal': signal,
             'reason': reason,
-            'calculation_steps': calculation_steps,
+            'calculation_steps': calculation_steps if explain else None,
             'indicators': {
-                'ma5': round(ma5, 2),
-                'ma10': round(ma10, 2),
-                'ma20': round(ma20, 2)
+                'ma5': ma5,
+                'ma10': ma10,
+                'ma20': ma20
             }
         }
 
-    def momentum_strategy(self, quote: dict, history_data: list = None) -> dict:
+    @_memoize_strategy
+    def momentum_strategy(self, quote: Quote, hist: HistoryArrays = None, explain: bool = None) -> dict:
         """
         动量策略
         
@@ -221,7 +779,7 @@ class StrategyEngine:
         需要的数据字段：
         - change_percent: 涨跌幅
         - volume: 成交量
-        - history_data: 历史数据，用于计算动量指标
+        - hist: 历史数据数组，用于计算动量指标
         
         数据计算方法：
         - 涨跌幅：直接使用API提供的数据
@@ -235,22 +793,23 @@ class StrategyEngine:
         - 卖出：涨跌幅 < -3%
         - 持有：其他情况
         """
-        change_percent = quote['change_percent']
-        volume = quote['volume']
+        change_percent = quote.change_percent
+        volume = quote.volume
         
-        # 记录计算过程
+        # 记录计算过程（explain为False时不生成，返回None）
         calculation_steps = []
         
         # 步骤1：获取基础数据
-        calculation_steps.append({
-            'step': 1,
-            'name': '获取基础数据',
-            'description': '从API获取股票的涨跌幅和成交量数据',
-            'data': {
-                'change_percent': change_percent,
-                'volume': volume
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 1,
+                'name': '获取基础数据',
+                'description': '从API获取股票的涨跌幅和成交量数据',
+                'data': {
+                    'change_percent': change_percent,
+                    'volume': volume
+                }
+            })
         
         # 步骤2：判断动量级别
         strong_buy = change_percent > 7
@@ -258,75 +817,73 @@ class StrategyEngine:
         strong_sell = change_percent < -7
         sell = change_percent < -3
         
-        calculation_steps.append({
-            'step': 2,
-            'name': '判断动量级别',
-            'description': '根据涨跌幅判断股票的动量强度',
-            'rules': {
-                '强势买入': '涨跌幅 > 7%',
-                '买入': '涨跌幅 > 3%',
-                '强势卖出': '涨跌幅 < -7%',
-                '卖出': '涨跌幅 < -3%'
-            },
-            'results': {
-                '强势买入': strong_buy,
-                '买入': buy,
-                '强势卖出': strong_sell,
-                '卖出': sell
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 2,
+                'name': '判断动量级别',
+                'description': '根据涨跌幅判断股票的动量强度',
+                'rules': {
+                    '强势买入': '涨跌幅 > 7%',
+                    '买入': '涨跌幅 > 3%',
+                    '强势卖出': '涨跌幅 < -7%',
+                    '卖出': '涨跌幅 < -3%'
+                },
+                'results': {
+                    '强势买入': strong_buy,
+                    '买入': buy,
+                    '强势卖出': strong_sell,
+                    '卖出': sell
+                }
+            })
         
         # 步骤3：结合成交量判断
         is_high_volume = volume > 10000000
         
-        calculation_steps.append({
-            'step': 3,
-            'name': '结合成交量判断',
-            'description': '分析成交量是否放大，增强动量信号的可靠性',
-            'analysis': {
-                '成交量 > 1000万股': is_high_volume
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 3,
+                'name': '结合成交量判断',
+                'description': '分析成交量是否放大，增强动量信号的可靠性',
+                'analysis': {
+                    '成交量 > 1000万股': is_high_volume
+                }
+            })
         
         # 步骤4：生成最终信号
-        signal = 'hold'
-        reason = ''
-        
         if strong_buy and is_high_volume:
-            signal = 'buy'
-            reason = f'强势涨停{change_percent:.2f}%，放量突破，建议买入'
+            signal, key = 'buy', 'strong_buy'
         elif buy:
-            signal = 'buy'
-            reason = f'上涨{change_percent:.2f}%，动能强劲，建议买入'
+            signal, key = 'buy', 'buy'
         elif strong_sell:
-            signal = 'sell'
-            reason = f'大幅下跌{abs(change_percent):.2f}%，风险极大，建议卖出'
+            signal, key = 'sell', 'strong_sell'
         elif sell:
-            signal = 'sell'
-            reason = f'下跌{abs(change_percent):.2f}%，动能转弱，建议卖出'
+            signal, key = 'sell', 'sell'
         else:
-            signal = 'hold'
-            reason = '波动较小，动能不足，建议观望'
-        
-        calculation_steps.append({
-            'step': 4,
-            'name': '生成最终信号',
-            'description': '根据动量级别和成交量生成最终的买卖信号',
-            'signal': signal,
-            'reason': reason
-        })
+            signal, key = 'hold', 'hold'
+        # 下跌时显示跌幅的绝对值
+        reason = _MOMENTUM_REASONS[key].format(abs(change_percent) if signal == 'sell' else change_percent)
+        
+        if explain:
+            calculation_steps.append({
+                'step': 4,
+                'name': '生成最终信号',
+                'description': '根据动量级别和成交量生成最终的买卖信号',
+                'signal': signal,
+                'reason': reason
+            })
         
         return {
             'signal': signal,
             'reason': reason,
-            'calculation_steps': calculation_steps,
+            'calculation_steps': calculation_steps if explain else None,
             'indicators': {
                 'change_percent': change_percent,
                 'volume': volume
             }
         }
 
-    def volume_strategy(self, quote: dict, history_data: list = None) -> dict:
+    @_memoize_strategy
+    def volume_strategy(self, quote: Quote, hist: HistoryArrays = None, explain: bool = None) -> dict:
         """
         成交量策略
         
@@ -339,7 +896,7 @@ class StrategyEngine:
         - volume: 成交量
         - amount: 成交额
         - change_percent: 涨跌幅
-        - history_data: 历史数据，用于计算平均成交量
+        - hist: 历史数据数组，用于计算平均成交量
         
         数据计算方法：
         - 成交量：直接使用API提供的数据
@@ -353,39 +910,41 @@ class StrategyEngine:
         - 买入：成交量比率 > 1.5 且 涨跌幅 > 0
         - 持有：其他情况
         """
-        volume = quote['volume']
-        amount = quote['amount']
-        change_percent = quote['change_percent']
+        volume = quote.volume
+        amount = quote.amount
+        change_percent = quote.change_percent
         
-        # 记录计算过程
+        # 记录计算过程（explain为False时不生成，返回None）
         calculation_steps = []
         
         # 步骤1：获取基础数据
-        calculation_steps.append({
-            'step': 1,
-            'name': '获取基础数据',
-            'description': '从API获取股票的成交量、成交额和涨跌幅数据',
-            'data': {
-                'volume': volume,
-                'amount': amount,
-                'change_percent': change_percent
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 1,
+                'name': '获取基础数据',
+                'description': '从API获取股票的成交量、成交额和涨跌幅数据',
+                'data': {
+                    'volume': volume,
+                    'amount': amount,
+                    'change_percent': change_percent
+                }
+            })
         
         # 步骤2：计算成交量比率
         avg_volume = 10000000
         volume_ratio = volume / avg_volume if avg_volume > 0 else 0
         
-        calculation_steps.append({
-            'step': 2,
-            'name': '计算成交量比率',
-            'description': '计算当前成交量与平均成交量的比率',
-            'formula': 'volume_ratio = volume / avg_volume',
-            'parameters': {
-                'avg_volume': avg_volume
-            },
-            'result': round(volume_ratio, 2)
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 2,
+                'name': '计算成交量比率',
+                'description': '计算当前成交量与平均成交量的比率',
+                'formula': 'volume_ratio = volume / avg_volume',
+                'parameters': {
+                    'avg_volume': avg_volume
+                },
+                'result': volume_ratio
+            })
         
         # 步骤3：分析成交量状态
         is_high_volume = volume_ratio > 2
@@ -393,58 +952,54 @@ class StrategyEngine:
         is_low_volume = volume_ratio < 0.5
         is_price_up = change_percent > 0
         
-        calculation_steps.append({
-            'step': 3,
-            'name': '分析成交量状态',
-            'description': '根据成交量比率判断成交量状态',
-            'analysis': {
-                '放量(>2倍)': is_high_volume,
-                '温和放量(1.5-2倍)': is_moderate_volume,
-                '缩量(<0.5倍)': is_low_volume,
-                '价格上涨': is_price_up
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 3,
+                'name': '分析成交量状态',
+                'description': '根据成交量比率判断成交量状态',
+                'analysis': {
+                    '放量(>2倍)': is_high_volume,
+                    '温和放量(1.5-2倍)': is_moderate_volume,
+                    '缩量(<0.5倍)': is_low_volume,
+                    '价格上涨': is_price_up
+                }
+            })
         
         # 步骤4：生成最终信号
-        signal = 'hold'
-        reason = ''
-        
         if is_high_volume and is_price_up:
-            signal = 'buy'
-            reason = f'放量上涨（成交量{volume_ratio:.1f}倍），资金流入明显，建议买入'
+            signal, key = 'buy', 'high_up'
         elif is_high_volume and not is_price_up:
-            signal = 'sell'
-            reason = f'放量下跌（成交量{volume_ratio:.1f}倍），资金流出明显，建议卖出'
+            signal, key = 'sell', 'high_down'
         elif is_low_volume:
-            signal = 'hold'
-            reason = '成交量萎缩，缺乏方向，建议观望'
+            signal, key = 'hold', 'low'
         elif is_moderate_volume and is_price_up:
-            signal = 'buy'
-            reason = '温和放量上涨，趋势向好，建议买入'
+            signal, key = 'buy', 'moderate_up'
         else:
-            signal = 'hold'
-            reason = '成交量正常，建议观望'
-        
-        calculation_steps.append({
-            'step': 4,
-            'name': '生成最终信号',
-            'description': '根据成交量状态和价格走势生成最终的买卖信号',
-            'signal': signal,
-            'reason': reason
-        })
+            signal, key = 'hold', 'normal'
+        reason = _VOLUME_REASONS[key].format(volume_ratio)
+        
+        if explain:
+            calculation_steps.append({
+                'step': 4,
+                'name': '生成最终信号',
+                'description': '根据成交量状态和价格走势生成最终的买卖信号',
+                'signal': signal,
+                'reason': reason
+            })
         
         return {
             'signal': signal,
             'reason': reason,
-            'calculation_steps': calculation_steps,
+            'calculation_steps': calculation_steps if explain else None,
             'indicators': {
                 'volume': volume,
-                'volume_ratio': round(volume_ratio, 2),
+                'volume_ratio': volume_ratio,
                 'change_percent': change_percent
             }
         }
 
-    def macd_strategy(self, quote: dict, history_data: list = None) -> dict:
+    @_memoize_strategy
+    def macd_strategy(self, quote: Quote, hist: HistoryArrays = None, ind: dict = None, explain: bool = None) -> dict:
         """
         MACD策略
         
@@ -458,7 +1013,8 @@ class StrategyEngine:
         - current_price: 当前价格
         - pre_close: 前收盘价
         - change_percent: 涨跌幅
-        - history_data: 历史数据，用于计算指数移动平均线
+        - hist: 历史数据数组，用于计算指数移动平均线
+        - ind: 批量预计算的指标（可选，由analyze_batch提供，提供时不再重复计算）
         
         数据计算方法：
         - EMA12: 12日指数移动平均线，公式：EMA(t) = 收盘价(t) * 2/(12+1) + EMA(t-1) * (12-1)/(12+1)
@@ -475,121 +1031,96 @@ class StrategyEngine:
         - 卖出：DIF < 0 且 DEA > 0（死叉）
         - 持有：其他情况
         """
-        current_price = quote['current_price']
-        pre_close = quote['pre_close']
-        change_percent = quote['change_percent']
+        current_price = quote.current_price
+        pre_close = quote.pre_close
+        change_percent = quote.change_percent
         
-        # 记录计算过程
+        # 记录计算过程（explain为False时不生成，返回None）
         calculation_steps = []
         
         # 步骤1：获取基础数据
-        calculation_steps.append({
-            'step': 1,
-            'name': '获取基础数据',
-            'description': '从API获取股票的当前价格和涨跌幅数据',
-            'data': {
-                'current_price': current_price,
-                'pre_close': pre_close,
-                'change_percent': change_percent
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 1,
+                'name': '获取基础数据',
+                'description': '从API获取股票的当前价格和涨跌幅数据',
+                'data': {
+                    'current_price': current_price,
+                    'pre_close': pre_close,
+                    'change_percent': change_percent
+                }
+            })
         
         # 步骤2：获取历史数据
-        closes = []
-        if history_data and len(history_data) > 0:
-            closes = [item['close'] for item in history_data]  # 获取所有历史收盘价
-        
-        # 步骤3：计算EMA（指数移动平均线）
-        # 使用真实历史数据计算EMA12、EMA26
-        ema12 = current_price
-        ema26 = current_price
-        
-        if len(closes) > 0:
-            # 初始化EMA为第一个收盘价
-            ema12 = closes[0]
-            ema26 = closes[0]
-            
-            # 计算EMA12和EMA26
-            for close in closes[1:]:
-                ema12 = close * 2/(12+1) + ema12 * (12-1)/(12+1)
-                ema26 = close * 2/(26+1) + ema26 * (26-1)/(26+1)
-        
-        calculation_steps.append({
-            'step': 2,
-            'name': '计算EMA',
-            'description': '计算12日和26日指数移动平均线',
-            'formulas': {
-                'EMA12': 'EMA(t) = 收盘价(t) * 2/(12+1) + EMA(t-1) * (12-1)/(12+1)',
-                'EMA26': 'EMA(t) = 收盘价(t) * 2/(26+1) + EMA(t-1) * (26-1)/(26+1)'
-            },
-            'results': {
-                'EMA12': round(ema12, 2),
-                'EMA26': round(ema26, 2)
-            }
-        })
-        
-        # 步骤4：计算DIF
-        dif = ema12 - ema26
-        
-        calculation_steps.append({
-            'step': 3,
-            'name': '计算DIF',
-            'description': '计算DIF（快线），即EMA12与EMA26的差值',
-            'formulas': {
-                'DIF': 'EMA12 - EMA26'
-            },
-            'results': {
-                'DIF': round(dif, 4)
-            }
-        })
-        
-        # 步骤5：计算DEA
-        # DEA是DIF的9日EMA
-        dea = dif
-        if len(closes) > 0:
-            # 计算DIF序列
-            difs = []
-            temp_ema12 = closes[0]
-            temp_ema26 = closes[0]
-            
-            for close in closes[1:]:
-                temp_ema12 = close * 2/(12+1) + temp_ema12 * (12-1)/(12+1)
-                temp_ema26 = close * 2/(26+1) + temp_ema26 * (26-1)/(26+1)
-                temp_dif = temp_ema12 - temp_ema26
-                difs.append(temp_dif)
-            
-            # 计算DEA
-            if len(difs) > 0:
-                dea = difs[0]
-                for d in difs[1:]:
-                    dea = d * 2/(9+1) + dea * (9-1)/(9+1)
-        
-        calculation_steps.append({
-            'step': 4,
-            'name': '计算DEA',
-            'description': '计算DEA（慢线），即DIF的9日指数移动平均线',
-            'formulas': {
-                'DEA': 'DEA(t) = DIF(t) * 2/(9+1) + DEA(t-1) * (9-1)/(9+1)'
-            },
-            'results': {
-                'DEA': round(dea, 4)
-            }
-        })
+        closes = _closes_array(hist)  # 获取所有历史收盘价
+        if len(closes) < _MIN_HISTORY['macd']:
+            return _insufficient_history(explain)
+        
+        # 步骤3：计算EMA（指数移动平均线）、DIF和DEA
+        # 使用真实历史数据计算，EMA递推与DIF序列在同一次遍历中完成
+        if ind is not None:
+            ema12, ema26, dif, dea = ind['EMA12'], ind['EMA26'], ind['DIF'], ind['DEA']
+        else:
+            ema12, ema26, dif, dea = (float(x) for x in macd_kernel(closes))
+        
+        if explain:
+            calculation_steps.append({
+                'step': 2,
+                'name': '计算EMA',
+                'description': '计算12日和26日指数移动平均线',
+                'formulas': {
+                    'EMA12': 'EMA(t) = 收盘价(t) * 2/(12+1) + EMA(t-1) * (12-1)/(12+1)',
+                    'EMA26': 'EMA(t) = 收盘价(t) * 2/(26+1) + EMA(t-1) * (26-1)/(26+1)'
+                },
+                'results': {
+                    'EMA12': ema12,
+                    'EMA26': ema26
+                }
+            })
+        
+        # 步骤4：DIF = EMA12 - EMA26
+        if explain:
+            calculation_steps.append({
+                'step': 3,
+                'name': '计算DIF',
+                'description': '计算DIF（快线），即EMA12与EMA26的差值',
+                'formulas': {
+                    'DIF': 'EMA12 - EMA26'
+                },
+                'results': {
+                    'DIF': dif
+                }
+            })
+        
+        # 步骤5：DEA是DIF的9日EMA
+        if explain:
+            calculation_steps.append({
+                'step': 4,
+                'name': '计算DEA',
+                'description': '计算DEA（慢线），即DIF的9日指数移动平均线',
+                'formulas': {
+                    'DEA': 'DEA(t) = DIF(t) * 2/(9+1) + DEA(t-1) * (9-1)/(9+1)'
+                },
+                'results': {
+                    'DEA': dea
+                }
+            })
         
         # 步骤6：计算MACD柱状图
         macd_bar = (dif - dea) * 2
         
-        calculation_steps.append({
-            'step': 5,
-            'name': '计算MACD柱状图',
-            'description': '计算MACD柱状图，表示DIF与DEA的差值',
-            'formulas': {
-                'MACD柱状图': '(DIF - DEA) * 2'
-            },
-            'results': {
-                'MACD柱状图': round(macd_bar, 4)
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 5,
+                'name': '计算MACD柱状图',
+                'description': '计算MACD柱状图，表示DIF与DEA的差值',
+                'formulas': {
+                    'MACD柱状图': '(DIF - DEA) * 2'
+                },
+                'results': {
+                    'MACD柱状图': macd_bar
+                }
+            })
         
         # 步骤4：分析MACD状态
         is_dif_above_dea = dif > dea
@@ -598,65 +1129,49 @@ class StrategyEngine:
         is_golden_cross = is_dif_above_dea and (dif > 0 or dea > 0)
         is_dead_cross = not is_dif_above_dea and (dif < 0 or dea < 0)
         
-        calculation_steps.append({
-            'step': 4,
-            'name': '分析MACD状态',
-            'description': '分析DIF与DEA的位置关系和零轴位置',
-            'analysis': {
-                'DIF > DEA': is_dif_above_dea,
-                'DIF在零轴上方': is_dif_above_zero,
-                'DEA在零轴上方': is_dea_above_zero,
-                '金叉信号': is_golden_cross,
-                '死叉信号': is_dead_cross
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 4,
+                'name': '分析MACD状态',
+                'description': '分析DIF与DEA的位置关系和零轴位置',
+                'analysis': {
+                    'DIF > DEA': is_dif_above_dea,
+                    'DIF在零轴上方': is_dif_above_zero,
+                    'DEA在零轴上方': is_dea_above_zero,
+                    '金叉信号': is_golden_cross,
+                    '死叉信号': is_dead_cross
+                }
+            })
         
         # 步骤5：生成最终信号
-        signal = 'hold'
-        reason = ''
-        
-        if is_dif_above_zero and is_dea_above_zero and is_dif_above_dea:
-            if change_percent > 2:
-                signal = 'buy'
-                reason = 'MACD金叉向上，多头排列，建议买入'
-            else:
-                signal = 'buy'
-                reason = 'MACD在零轴上方，多头趋势，建议买入'
-        elif not is_dif_above_zero and not is_dea_above_zero and not is_dif_above_dea:
-            signal = 'sell'
-            reason = 'MACD死叉向下，空头排列，建议卖出'
-        elif is_dif_above_zero and not is_dea_above_zero:
-            signal = 'buy'
-            reason = 'MACD金叉，趋势反转向上，建议买入'
-        elif not is_dif_above_zero and is_dea_above_zero:
-            signal = 'sell'
-            reason = 'MACD死叉，趋势反转向下，建议卖出'
-        else:
-            signal = 'hold'
-            reason = 'MACD信号不明确，建议观望'
-        
-        calculation_steps.append({
-            'step': 5,
-            'name': '生成最终信号',
-            'description': '根据MACD状态生成最终的买卖信号',
-            'signal': signal,
-            'reason': reason
-        })
+        mask = (is_dif_above_zero << 3 | is_dea_above_zero << 2 |
+                is_dif_above_dea << 1 | (change_percent > 2))
+        signal, reason = _MACD_DECISION[mask]
+        
+        if explain:
+            calculation_steps.append({
+                'step': 5,
+                'name': '生成最终信号',
+                'description': '根据MACD状态生成最终的买卖信号',
+                'signal': signal,
+                'reason': reason
+            })
         
         return {
             'signal': signal,
             'reason': reason,
-            'calculation_steps': calculation_steps,
+            'calculation_steps': calculation_steps if explain else None,
             'indicators': {
-                'DIF': round(dif, 4),
-                'DEA': round(dea, 4),
-                'MACD_bar': round(macd_bar, 4),
-                'EMA12': round(ema12, 2),
-                'EMA26': round(ema26, 2)
+                'DIF': dif,
+                'DEA': dea,
+                'MACD_bar': macd_bar,
+                'EMA12': ema12,
+                'EMA26': ema26
             }
         }
 
-    def rsi_strategy(self, quote: dict, history_data: list = None) -> dict:
+    @_memoize_strategy
+    def rsi_strategy(self, quote: Quote, hist: HistoryArrays = None, ind: dict = None, explain: bool = None) -> dict:
         """
         RSI策略
         
@@ -670,7 +1185,8 @@ class StrategyEngine:
         - current_price: 当前价格
         - pre_close: 前收盘价
         - change_percent: 涨跌幅
-        - history_data: 历史数据，用于计算14日平均涨跌
+        - hist: 历史数据数组，用于计算14日平均涨跌
+        - ind: 批量预计算的指标（可选，由analyze_batch提供，提供时不再重复计算）
         
         数据计算方法：
         - change: 价格变动额 = 当日收盘价 - 前一日收盘价
@@ -690,135 +1206,97 @@ class StrategyEngine:
         - 卖出：RSI > 60
         - 持有：其他情况
         """
-        current_price = quote['current_price']
-        pre_close = quote['pre_close']
-        change_percent = quote['change_percent']
+        current_price = quote.current_price
+        pre_close = quote.pre_close
+        change_percent = quote.change_percent
         
-        # 记录计算过程
+        # 记录计算过程（explain为False时不生成，返回None）
         calculation_steps = []
         
         # 步骤1：获取基础数据
-        calculation_steps.append({
-            'step': 1,
-            'name': '获取基础数据',
-            'description': '从API获取股票的价格数据',
-            'data': {
-                'current_price': current_price,
-                'pre_close': pre_close,
-                'change_percent': change_percent
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 1,
+                'name': '获取基础数据',
+                'description': '从API获取股票的价格数据',
+                'data': {
+                    'current_price': current_price,
+                    'pre_close': pre_close,
+                    'change_percent': change_percent
+                }
+            })
         
         # 步骤2：获取历史数据
-        closes = []
-        if history_data and len(history_data) > 0:
-            closes = [item['close'] for item in history_data]  # 获取所有历史收盘价
-        
-        # 步骤3：计算价格变动
-        changes = []
-        if len(closes) >= 2:
-            for i in range(1, len(closes)):
-                change = closes[i] - closes[i-1]
-                changes.append(change)
-        
-        calculation_steps.append({
-            'step': 2,
-            'name': '计算价格变动',
-            'description': '计算每日收盘价与前一日收盘价的变动额',
-            'formula': 'change = 当日收盘价 - 前一日收盘价',
-            'data': {
-                '历史数据条数': len(closes),
-                '价格变动计算条数': len(changes)
-            }
-        })
-        
-        # 步骤4：计算涨跌金额
-        gains = []
-        losses = []
-        for change in changes:
-            if change > 0:
-                gains.append(change)
-                losses.append(0)
-            else:
-                gains.append(0)
-                losses.append(abs(change))
-        
-        calculation_steps.append({
-            'step': 3,
-            'name': '计算涨跌金额',
-            'description': '根据价格变动计算每日上涨金额和下跌金额',
-            'rules': {
-                'gain': 'change > 0时为change，否则为0',
-                'loss': 'change < 0时为abs(change)，否则为0'
-            },
-            'data': {
-                '上涨天数': sum(1 for g in gains if g > 0),
-                '下跌天数': sum(1 for l in losses if l > 0)
-            }
-        })
-        
-        # 步骤5：计算平均涨跌金额（14日）
-        avg_gain = 0
-        avg_loss = 0
-        
-        if len(gains) >= 14:
-            # 首次计算：前14天的平均值
-            initial_gains = gains[:14]
-            initial_losses = losses[:14]
-            
-            avg_gain = sum(initial_gains) / 14
-            avg_loss = sum(initial_losses) / 14
-            
-            # 后续计算：使用平滑移动平均
-            for i in range(14, len(gains)):
-                avg_gain = (avg_gain * 13 + gains[i]) / 14
-                avg_loss = (avg_loss * 13 + losses[i]) / 14
-        elif len(gains) > 0:
-            # 如果历史数据不足14天，使用现有数据的平均值
-            avg_gain = sum(gains) / len(gains)
-            avg_loss = sum(losses) / len(losses)
-        
-        calculation_steps.append({
-            'step': 4,
-            'name': '计算平均涨跌金额',
-            'description': '计算14日平均上涨金额和平均下跌金额',
-            'formulas': {
-                'avg_gain': '(avg_gain_prev * 13 + gain_current) / 14',
-                'avg_loss': '(avg_loss_prev * 13 + loss_current) / 14'
-            },
-            'results': {
-                'avg_gain': round(avg_gain, 4),
-                'avg_loss': round(avg_loss, 4)
-            }
-        })
-        
-        # 步骤6：计算RS和RSI
-        rsi = 50  # 默认值，当没有足够数据时使用
-        rs = 1
-        
-        if avg_loss == 0:
-            rs = float('inf')
-            rsi = 100
-        elif avg_gain == 0:
-            rs = 0
-            rsi = 0
+        closes = _closes_array(hist)  # 获取所有历史收盘价
+        if len(closes) < _MIN_HISTORY['rsi']:
+            return _insufficient_history(explain)
+        
+        # 步骤3~6：价格变动、涨跌金额、14日平滑平均及RSI在同一次遍历中完成
+        if ind is not None:
+            rsi, avg_gain, avg_loss = ind['RSI'], ind['avg_gain'], ind['avg_loss']
+            up_days, down_days = ind['up_days'], ind['down_days']
         else:
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-        
-        calculation_steps.append({
-            'step': 5,
-            'name': '计算RSI指标',
-            'description': '计算相对强弱（RS）和相对强弱指标（RSI）',
-            'formulas': {
-                'RS': 'avg_gain / avg_loss',
-                'RSI': '100 - (100 / (1 + RS))'
-            },
-            'results': {
-                'RS': round(rs, 4) if avg_loss != 0 else '无穷大',
-                'RSI': round(rsi, 2)
-            }
-        })
+            rsi, avg_gain, avg_loss, up_days, down_days = rsi_kernel(closes, 14)
+            rsi = float(rsi)
+            avg_gain = float(avg_gain)
+            avg_loss = float(avg_loss)
+        
+        if explain:
+            calculation_steps.append({
+                'step': 2,
+                'name': '计算价格变动',
+                'description': '计算每日收盘价与前一日收盘价的变动额',
+                'formula': 'change = 当日收盘价 - 前一日收盘价',
+                'data': {
+                    '历史数据条数': len(closes),
+                    '价格变动计算条数': max(len(closes) - 1, 0)
+                }
+            })
+        
+        if explain:
+            calculation_steps.append({
+                'step': 3,
+                'name': '计算涨跌金额',
+                'description': '根据价格变动计算每日上涨金额和下跌金额',
+                'rules': {
+                    'gain': 'change > 0时为change，否则为0',
+                    'loss': 'change < 0时为abs(change)，否则为0'
+                },
+                'data': {
+                    '上涨天数': int(up_days),
+                    '下跌天数': int(down_days)
+                }
+            })
+        
+        if explain:
+            calculation_steps.append({
+                'step': 4,
+                'name': '计算平均涨跌金额',
+                'description': '计算14日平均上涨金额和平均下跌金额',
+                'formulas': {
+                    'avg_gain': '(avg_gain_prev * 13 + gain_current) / 14',
+                    'avg_loss': '(avg_loss_prev * 13 + loss_current) / 14'
+                },
+                'results': {
+                    'avg_gain': avg_gain,
+                    'avg_loss': avg_loss
+                }
+            })
+        
+        if explain:
+            calculation_steps.append({
+                'step': 5,
+                'name': '计算RSI指标',
+                'description': '计算相对强弱（RS）和相对强弱指标（RSI）',
+                'formulas': {
+                    'RS': 'avg_gain / avg_loss',
+                    'RSI': '100 - (100 / (1 + RS))'
+                },
+                'results': {
+                    'RS': avg_gain / avg_loss if avg_loss != 0 else '无穷大',
+                    'RSI': rsi
+                }
+            })
         
         # 步骤6：分析RSI状态
         is_oversold = rsi < 30
@@ -828,55 +1306,42 @@ class StrategyEngine:
         is_moderate_drop = change_percent < -3
         is_moderate_rise = change_percent > 3
         
-        calculation_steps.append({
-            'step': 6,
-            'name': '分析RSI状态',
-            'description': '根据RSI值判断股票的超买超卖状态',
-            'analysis': {
-                '超卖(<30)': is_oversold,
-                '超买(>70)': is_overbought,
-                '偏低(30-40)': is_low,
-                '偏高(60-70)': is_high,
-                '温和下跌(< -3%)': is_moderate_drop,
-                '温和上涨(> 3%)': is_moderate_rise
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                'step': 6,
+                'name': '分析RSI状态',
+                'description': '根据RSI值判断股票的超买超卖状态',
+                'analysis': {
+                    '超卖(<30)': is_oversold,
+                    '超买(>70)': is_overbought,
+                    '偏低(30-40)': is_low,
+                    '偏高(60-70)': is_high,
+                    '温和下跌(< -3%)': is_moderate_drop,
+                    '温和上涨(> 3%)': is_moderate_rise
+                }
+            })
         
         # 步骤7：生成最终信号
-        signal = 'hold'
-        reason = ''
-        
         if is_oversold:
-            if is_moderate_drop:
-                signal = 'buy'
-                reason = f'RSI超卖（{rsi:.1f}），可能反弹，建议买入'
-            else:
-                signal = 'buy'
-                reason = f'RSI超卖（{rsi:.1f}），建议买入'
+            signal, key = 'buy', 'oversold_drop' if is_moderate_drop else 'oversold'
         elif is_overbought:
-            if is_moderate_rise:
-                signal = 'sell'
-                reason = f'RSI超买（{rsi:.1f}），可能回调，建议卖出'
-            else:
-                signal = 'sell'
-                reason = f'RSI超买（{rsi:.1f}），建议卖出'
+            signal, key = 'sell', 'overbought_rise' if is_moderate_rise else 'overbought'
         elif is_low:
-            signal = 'buy'
-            reason = f'RSI偏低（{rsi:.1f}），考虑买入'
+            signal, key = 'buy', 'low'
         elif is_high:
-            signal = 'sell'
-            reason = f'RSI偏高（{rsi:.1f}），考虑卖出'
+            signal, key = 'sell', 'high'
         else:
-            signal = 'hold'
-            reason = f'RSI中性（{rsi:.1f}），建议观望'
-        
-        calculation_steps.append({
-            'step': 7,
-            'name': '生成最终信号',
-            'description': '根据RSI状态生成最终的买卖信号',
-            'signal': signal,
-            'reason': reason
-        })
+            signal, key = 'hold', 'neutral'
+        reason = _RSI_REASONS[key].format(rsi)
+        
+        if explain:
+            calculation_steps.append({
+                'step': 7,
+                'name': '生成最终信号',
+                'description': '根据RSI状态生成最终的买卖信号',
+                'signal': signal,
+                'reason': reason
+            })
         
         # 计算当前涨跌金额
         current_change = current_price - pre_close
@@ -886,15 +1351,16 @@ class StrategyEngine:
         return {
             'signal': signal,
             'reason': reason,
-            'calculation_steps': calculation_steps,
+            'calculation_steps': calculation_steps if explain else None,
             'indicators': {
-                'RSI': round(rsi, 2),
-                'gain': round(current_gain, 2),
-                'loss': round(current_loss, 2)
+                'RSI': rsi,
+                'gain': current_gain,
+                'loss': current_loss
             }
         }
 
-    def bollinger_strategy(self, quote: dict, history_data: list = None) -> dict:
+    @_memoize_strategy
+    def bollinger_strategy(self, quote: Quote, hist: HistoryArrays = None, ind: dict = None, explain: bool = None) -> dict:
         """
         布林带策略
         
@@ -910,7 +1376,8 @@ class StrategyEngine:
         - high_price: 最高价
         - low_price: 最低价
         - pre_close: 前收盘价
-        - history_data: 历史数据，用于计算移动平均线和标准差
+        - hist: 历史数据数组，用于计算移动平均线和标准差
+        - ind: 批量预计算的指标（可选，由analyze_batch提供，提供时不再重复计算）
         
         数据计算方法：
         - MA20: 20日移动平均线 = 20日收盘价的平均值
@@ -927,109 +1394,76 @@ class StrategyEngine:
         - 持有：bandwidth < 5%
         - 持有：其他情况
         """
-        current_price = quote['current_price']
-        high_price = quote['high_price']
-        low_price = quote['low_price']
-        pre_close = quote['pre_close']
+        current_price = quote.current_price
+        high_price = quote.high_price
+        low_price = quote.low_price
+        pre_close = quote.pre_close
         
-        # 记录计算过程
+        # 记录计算过程（explain为False时不生成，返回None）
         calculation_steps = []
         
         # 步骤1：获取基础数据
-        calculation_steps.append({
-            'step': 1,
-            'name': '获取基础数据',
-            'description': '从API获取股票的价格数据',
-            'data': {
-                'current_price': current_price,
-                'high_price': high_price,
-                'low_price': low_price,
-                'pre_close': pre_close
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                **_BOLL_STEP_TEMPLATES[0],
+                'data': {
+                    'current_price': current_price,
+                    'high_price': high_price,
+                    'low_price': low_price,
+                    'pre_close': pre_close
+                }
+            })
         
         # 步骤2：获取历史数据
-        closes = []
-        if history_data and len(history_data) > 0:
-            closes = [item['close'] for item in history_data]  # 获取所有历史收盘价
-        
-        # 步骤3：计算中轨（MA20）
-        ma20 = current_price
-        
-        if len(closes) >= 20:
-            # 使用最近20天的收盘价计算MA20
-            recent_closes = closes[-20:]
-            ma20 = sum(recent_closes) / 20
-        elif len(closes) > 0:
-            # 如果历史数据不足20天，使用现有数据的平均值
-            ma20 = sum(closes) / len(closes)
-        
-        calculation_steps.append({
-            'step': 2,
-            'name': '计算中轨',
-            'description': '计算20日移动平均线（中轨）',
-            'formula': 'MA20 = 20日收盘价的平均值',
-            'results': {
-                'MA20': round(ma20, 2),
-                '使用数据条数': len(closes)
-            }
-        })
-        
-        # 步骤4：计算标准差（20日）
-        std = 0
-        
-        if len(closes) >= 20:
-            recent_closes = closes[-20:]
-            # 计算平均值
-            mean = sum(recent_closes) / 20
-            # 计算方差
-            variance = sum((close - mean) ** 2 for close in recent_closes) / 20
-            # 计算标准差
-            std = variance ** 0.5
-        elif len(closes) > 1:
-            # 如果历史数据不足20天，使用现有数据计算
-            mean = sum(closes) / len(closes)
-            variance = sum((close - mean) ** 2 for close in closes) / len(closes)
-            std = variance ** 0.5
-        
-        calculation_steps.append({
-            'step': 3,
-            'name': '计算标准差',
-            'description': '计算20日收盘价的标准差',
-            'formula': 'std = sqrt(平均(每个收盘价-MA20)^2)',
-            'results': {
-                'std': round(std, 2)
-            }
-        })
+        closes = _closes_array(hist)  # 获取所有历史收盘价
+        if len(closes) < _MIN_HISTORY['bollinger']:
+            return _insufficient_history(explain)
+        
+        # 步骤3~4：中轨（MA20）与标准差一次遍历算出
+        # 使用最近20天的收盘价
+        if ind is not None:
+            ma20, std = ind['BB_MA20'], ind['BB_std']
+        else:
+            ma20, std = (float(x) for x in bb_kernel(closes, 20))
+        
+        if explain:
+            calculation_steps.append({
+                **_BOLL_STEP_TEMPLATES[1],
+                'results': {
+                    'MA20': ma20,
+                    '使用数据条数': len(closes)
+                }
+            })
+        
+        if explain:
+            calculation_steps.append({
+                **_BOLL_STEP_TEMPLATES[2],
+                'results': {
+                    'std': std
+                }
+            })
         
         # 步骤4：计算上下轨
         upper_band = ma20 + 2 * std
         lower_band = ma20 - 2 * std
         
-        calculation_steps.append({
-            'step': 4,
-            'name': '计算上下轨',
-            'description': '计算布林带的上轨和下轨',
-            'formulas': {
-                'upper_band': 'MA20 + 2 * std',
-                'lower_band': 'MA20 - 2 * std'
-            },
-            'results': {
-                'upper_band': round(upper_band, 2),
-                'lower_band': round(lower_band, 2)
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                **_BOLL_STEP_TEMPLATES[3],
+                'results': {
+                    'upper_band': upper_band,
+                    'lower_band': lower_band
+                }
+            })
         
         # 步骤5：计算带宽
         bandwidth = (upper_band - lower_band) / ma20 * 100
         
-        calculation_steps.append({
-            'step': 5,
-            'name': '计算带宽',
-            'description': '计算布林带的带宽，衡量价格波动范围',
-            'formula': 'bandwidth = (upper_band - lower_band) / MA20 * 100',
-            'result': round(bandwidth, 2)
-        })
+        if explain:
+            calculation_steps.append({
+                **_BOLL_STEP_TEMPLATES[4],
+                'result': bandwidth
+            })
         
         # 步骤6：分析布林带状态
         is_price_above_upper = current_price > upper_band
@@ -1038,59 +1472,39 @@ class StrategyEngine:
         is_wide_bandwidth = bandwidth > 10
         is_narrow_bandwidth = bandwidth < 5
         
-        calculation_steps.append({
-            'step': 6,
-            'name': '分析布林带状态',
-            'description': '分析当前价格与布林带的位置关系',
-            'analysis': {
-                '价格突破上轨': is_price_above_upper,
-                '价格跌破下轨': is_price_below_lower,
-                '价格在中轨上方': is_price_above_ma20,
-                '带宽扩大(>10%)': is_wide_bandwidth,
-                '带宽收窄(<5%)': is_narrow_bandwidth
-            }
-        })
+        if explain:
+            calculation_steps.append({
+                **_BOLL_STEP_TEMPLATES[5],
+                'analysis': {
+                    '价格突破上轨': is_price_above_upper,
+                    '价格跌破下轨': is_price_below_lower,
+                    '价格在中轨上方': is_price_above_ma20,
+                    '带宽扩大(>10%)': is_wide_bandwidth,
+                    '带宽收窄(<5%)': is_narrow_bandwidth
+                }
+            })
         
         # 步骤7：生成最终信号
-        signal = 'hold'
-        reason = ''
+        mask = (is_price_above_upper << 4 | is_price_below_lower << 3 | is_price_above_ma20 << 2 |
+                is_wide_bandwidth << 1 | is_narrow_bandwidth)
+        signal, reason = _BOLLINGER_DECISION[mask]
         
-        if is_price_above_upper:
-            signal = 'sell'
-            reason = '股价突破上轨，超买信号，建议卖出'
-        elif is_price_below_lower:
-            signal = 'buy'
-            reason = '股价跌破下轨，超卖信号，建议买入'
-        elif is_price_above_ma20 and is_wide_bandwidth:
-            signal = 'buy'
-            reason = '股价在中轨上方，布林带开口，建议买入'
-        elif not is_price_above_ma20 and is_wide_bandwidth:
-            signal = 'sell'
-            reason = '股价在中轨下方，布林带开口，建议卖出'
-        elif is_narrow_bandwidth:
-            signal = 'hold'
-            reason = '布林带收窄，等待突破，建议观望'
-        else:
-            signal = 'hold'
-            reason = '股价在中轨附近，建议观望'
-        
-        calculation_steps.append({
-            'step': 7,
-            'name': '生成最终信号',
-            'description': '根据布林带状态生成最终的买卖信号',
-            'signal': signal,
-            'reason': reason
-        })
+        if explain:
+            calculation_steps.append({
+                **_BOLL_STEP_TEMPLATES[6],
+                'signal': signal,
+                'reason': reason
+            })
         
         return {
             'signal': signal,
             'reason': reason,
-            'calculation_steps': calculation_steps,
+            'calculation_steps': calculation_steps if explain else None,
             'indicators': {
-                'MA20': round(ma20, 2),
-                'std': round(std, 2),
-                'upper_band': round(upper_band, 2),
-                'lower_band': round(lower_band, 2),
-                'bandwidth': round(bandwidth, 2)
+                'MA20': ma20,
+                'std': std,
+                'upper_band': upper_band,
+                'lower_band': lower_band,
+                'bandwidth': bandwidth
             }
         }
@@ -1,61 +1,189 @@
+import logging
+import mmap
 import os
-import json
+import threading
+import time
+import numpy as np
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from .models import Account, Position, Trade
 from .config import Config
 
+logger = logging.getLogger(__name__)
+
 class DataManager:
     def __init__(self):
         self.ensure_data_dir()
+        # 单线程后台写盘：保证写入顺序，且不阻塞请求线程
+        self._writer = ThreadPoolExecutor(max_workers=1)
 
     def ensure_data_dir(self):
         if not os.path.exists(Config.DATA_DIR):
             os.makedirs(Config.DATA_DIR)
 
-    def save_account(self, account: Account):
-        with open(Config.ACCOUNT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(account.to_dict(), f, ensure_ascii=False, indent=2)
+    def _write_json(self, path: str, data):
+        # 先写临时文件再原子替换，避免写入中途崩溃导致文件损坏
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        os.replace(tmp_path, path)
+
+    def _write_all(self, account_data: dict, positions_data: list):
+        try:
+            if account_data is not None:
+                self._write_json(Config.ACCOUNT_FILE, account_data)
+            if positions_data is not None:
+                self._write_json(Config.POSITIONS_FILE, positions_data)
+        except Exception:
+            logger.exception("保存账户和持仓数据失败")
+
+    def _write_trade_lines(self, trades_data: list, mode: str):
+        try:
+            with open(Config.TRADES_LOG_FILE, mode) as f:
+                f.write(b''.join(orjson.dumps(item) + b'\n' for item in trades_data))
+        except Exception:
+            logger.exception("保存交易记录失败")
+
+    def _submit(self, fn, *args):
+        try:
+            return self._writer.submit(fn, *args)
+        except RuntimeError:
+            # 解释器退出时线程池先于atexit回调关闭（已提交的任务均已完成），直接同步写入
+            fn(*args)
+            return None
+
+    def save_all_async(self, account: Account = None, positions: list = None):
+        """在调用线程中生成账户和持仓快照，交由后台线程写盘；为None的部分不写"""
+        account_data = account.to_dict() if account is not None else None
+        positions_data = [pos.to_dict() for pos in positions] if positions is not None else None
+        return self._submit(self._write_all, account_data, positions_data)
+
+    def append_trade(self, trade: Trade):
+        """追加一条交易记录到日志文件末尾，写入量与历史交易数量无关"""
+        return self.append_trades([trade])
+
+    def append_trades(self, trades: list):
+        """一次写入追加多条交易记录"""
+        return self._submit(self._write_trade_lines, [trade.to_dict() for trade in trades], 'ab')
+
+    def clear_trades(self):
+        return self._submit(self._write_trade_lines, [], 'wb')
+
+    def flush(self):
+        """等待所有已提交的写盘任务完成"""
+        try:
+            self._writer.submit(lambda: None).result()
+        except RuntimeError:
+            pass  # 线程池已关闭，不再有待完成的写盘任务
 
     def load_account(self) -> Account:
         if os.path.exists(Config.ACCOUNT_FILE):
-            with open(Config.ACCOUNT_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(Config.ACCOUNT_FILE, 'rb') as f:
+                data = orjson.loads(f.read())
                 return Account.from_dict(data)
         return Account(Config.INITIAL_CAPITAL)
 
-    def save_positions(self, positions: list):
-        with open(Config.POSITIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump([pos.to_dict() for pos in positions], f, ensure_ascii=False, indent=2)
-
     def load_positions(self) -> list:
         if os.path.exists(Config.POSITIONS_FILE):
-            with open(Config.POSITIONS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(Config.POSITIONS_FILE, 'rb') as f:
+                data = orjson.loads(f.read())
                 return [Position.from_dict(item) for item in data]
         return []
 
     def save_trades(self, trades: list):
-        with open(Config.TRADES_FILE, 'w', encoding='utf-8') as f:
-            json.dump([trade.to_dict() for trade in trades], f, ensure_ascii=False, indent=2)
-
-    def load_trades(self) -> list:
+        self._write_trade_lines([trade.to_dict() for trade in trades], 'wb')
+
+    @staticmethod
+    def _tail_offset(mm: mmap.mmap, since: str) -> int:
+        """从日志末尾向前逐行查找，返回第一条created_at不早于since的记录的起始位置"""
+        end = len(mm)
+        while end > 0:
+            start = mm.rfind(b'\n', 0, end - 1) + 1
+            try:
+                if orjson.loads(mm[start:end])['created_at'] < since:
+                    return end
+            except (orjson.JSONDecodeError, KeyError):
+                pass
+            end = start
+        return 0
+
+    def load_trades(self, since: str = None) -> list:
+        """
+        加载交易记录
+
+        Args:
+            since: ISO格式时间，只加载此时间及之后的记录；日志按时间顺序追加，
+                   从文件末尾向前定位，读取量只与返回的记录数有关
+
+        Returns:
+            Trade列表（按时间顺序）
+        """
+        if os.path.exists(Config.TRADES_LOG_FILE):
+            trades = []
+            with open(Config.TRADES_LOG_FILE, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return trades
+                # 内存映射按需分页读取，逐行解析，不生成整个文件的中间字符串
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if since:
+                        mm.seek(self._tail_offset(mm, since))
+                    while True:
+                        offset = mm.tell()
+                        line = mm.readline()
+                        if not line:
+                            break
+                        if not line.strip():
+                            continue
+                        try:
+                            trade = Trade.from_dict(orjson.loads(line))
+                        except orjson.JSONDecodeError:
+                            # 写入中途中断可能留下不完整的末行，跳过
+                            logger.warning("跳过损坏的交易记录（%s 偏移 %d）: %r",
+                                           Config.TRADES_LOG_FILE, offset, line[:80])
+                            continue
+                        if since and trade.created_at < since:
+                            continue
+                        trades.append(trade)
+            return trades
         if os.path.exists(Config.TRADES_FILE):
-            with open(Config.TRADES_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [Trade.from_dict(item) for item in data]
+            # 迁移旧版整体JSON格式的交易记录
+            with open(Config.TRADES_FILE, 'rb') as f:
+                data = orjson.loads(f.read())
+                trades = [Trade.from_dict(item) for item in data]
+            self.save_trades(trades)
+            if since:
+                trades = [trade for trade in trades if trade.created_at >= since]
+            return trades
         return []
 
 class TradingEngine:
-    def __init__(self, data_manager: DataManager):
+    def __init__(self, data_manager: DataManager, auto_save: bool = True):
+        """
+        Args:
+            data_manager: 数据持久化管理器
+            auto_save: 每次修改后自动写盘；为False时只在flush()时写入（适用于回测等批量重放）
+        """
         self.data_manager = data_manager
+        self.auto_save = auto_save
         self.account = data_manager.load_account()
-        self.positions = data_manager.load_positions()
+        # 持仓按股票代码索引，买卖和价格更新时O(1)查找
+        self._positions = {p.stock_code: p for p in data_manager.load_positions()}
         self.trades = data_manager.load_trades()
+        # 账户和持仓快照按Config.SNAPSHOT_INTERVAL节流写盘，间隔内的修改由定时器合并写入
+        self._snapshot_lock = threading.Lock()
+        self._last_snapshot = 0.0
+        self._snapshot_timer = None
+        # 记录自上次写盘以来被修改的部分，只写入有变化的文件
+        self._dirty = {'account': False, 'positions': False, 'trades': False}
+        self._pending_trades = []  # 尚未写入日志的交易记录
+        self._batch_depth = 0
 
     def get_account(self) -> Account:
         return self.account
 
     def get_positions(self) -> list:
-        return self.positions
+        return list(self._positions.values())
 
     def get_trades(self) -> list:
         return self.trades
@@ -64,6 +192,42 @@ class TradingEngine:
         commission = amount * Config.COMMISSION_RATE
         return max(commission, Config.MIN_COMMISSION)
 
+    def calculate_commissions(self, amounts: np.ndarray) -> np.ndarray:
+        """批量计算手续费，与calculate_commission逐笔计算的结果相同"""
+        return np.maximum(amounts * Config.COMMISSION_RATE, Config.MIN_COMMISSION)
+
+    def _apply_buy(self, stock_code: str, stock_name: str, price: float, shares: int,
+                   amount: float, commission: float):
+        self.account.available_cash -= amount + commission
+
+        existing_position = self._positions.get(stock_code)
+        if existing_position:
+            total_shares = existing_position.shares + shares
+            total_cost_amount = existing_position.cost_amount + amount
+            existing_position.shares = total_shares
+            existing_position.cost_price = total_cost_amount / total_shares
+            existing_position.cost_amount = total_cost_amount
+            existing_position.update_price(price)
+        else:
+            position = Position(stock_code, stock_name, shares, price)
+            self._positions[stock_code] = position
+
+        self._record_trade(Trade('buy', stock_code, stock_name, shares, price, amount, commission))
+
+    def _apply_sell(self, stock_code: str, stock_name: str, price: float, shares: int,
+                    amount: float, commission: float):
+        self.account.available_cash += amount - commission
+
+        position = self._positions[stock_code]
+        if shares == position.shares:
+            del self._positions[stock_code]
+        else:
+            position.shares -= shares
+            position.cost_amount -= (position.cost_price * shares)
+            position.update_price(price)
+
+        self._record_trade(Trade('sell', stock_code, stock_name, shares, price, amount, commission))
+
     def buy_stock(self, stock_code: str, stock_name: str, price: float, shares: int) -> tuple[bool, str]:
         try:
             amount = price * shares
@@ -73,22 +237,7 @@ class TradingEngine:
             if total_cost > self.account.available_cash:
                 return False, "资金不足"
 
-            self.account.available_cash -= total_cost
-
-            existing_position = next((p for p in self.positions if p.stock_code == stock_code), None)
-            if existing_position:
-                total_shares = existing_position.shares + shares
-                total_cost_amount = existing_position.cost_amount + amount
-                existing_position.shares = total_shares
-                existing_position.cost_price = total_cost_amount / total_shares
-                existing_position.cost_amount = total_cost_amount
-                existing_position.update_price(price)
-            else:
-                position = Position(stock_code, stock_name, shares, price)
-                self.positions.append(position)
-
-            trade = Trade('buy', stock_code, stock_name, shares, price, amount, commission)
-            self.trades.append(trade)
+            self._apply_buy(stock_code, stock_name, price, shares, amount, commission)
 
             self.update_account_stats()
             self.save_all()
@@ -99,7 +248,7 @@ class TradingEngine:
 
     def sell_stock(self, stock_code: str, stock_name: str, price: float, shares: int) -> tuple[bool, str]:
         try:
-            position = next((p for p in self.positions if p.stock_code == stock_code), None)
+            position = self._positions.get(stock_code)
             if not position:
                 return False, "未持有该股票"
 
@@ -108,19 +257,8 @@ class TradingEngine:
 
             amount = price * shares
             commission = self.calculate_commission(amount)
-            total_income = amount - commission
-
-            self.account.available_cash += total_income
-
-            if shares == position.shares:
-                self.positions.remove(position)
-            else:
-                position.shares -= shares
-                position.cost_amount -= (position.cost_price * shares)
-                position.update_price(price)
 
-            trade = Trade('sell', stock_code, stock_name, shares, price, amount, commission)
-            self.trades.append(trade)
+            self._apply_sell(stock_code, stock_name, price, shares, amount, commission)
 
             self.update_account_stats()
             self.save_all()
@@ -129,33 +267,220 @@ class TradingEngine:
         except Exception as e:
             return False, f"卖出失败: {str(e)}"
 
+    @staticmethod
+    def _check_batch(stock_codes: list, stock_names: list, prices: np.ndarray, shares: np.ndarray) -> str:
+        """检查批量交易参数，返回错误信息；参数有效时返回None"""
+        n = len(stock_codes)
+        if n == 0:
+            return "参数不完整"
+        if len(stock_names) != n or prices.shape != (n,) or shares.shape != (n,):
+            return "批量参数长度不一致"
+        if not (np.isfinite(prices).all() and (prices > 0).all() and (shares > 0).all()):
+            return "价格和股数必须为正数"
+        # 股数先按float64读入再检查，避免转换为整数时把100.7股截断为100股
+        if not (np.isfinite(shares).all() and (shares == np.floor(shares)).all()):
+            return "股数必须为整数"
+        return None
+
+    def buy_stocks_batch(self, stock_codes: list, stock_names: list, prices, shares) -> tuple[bool, str]:
+        """
+        批量买入（用于回测等批量重放），全部成交或全部不成交
+
+        成交金额和手续费以数组一次算出，资金是否充足只检查一次总额。
+        各参数长度不一致、存在非正的价格或股数、股数不是整数时整批拒绝。
+
+        Args:
+            stock_codes: 股票代码列表
+            stock_names: 股票名称列表
+            prices: 成交价格（与stock_codes等长）
+            shares: 买入股数（与stock_codes等长）
+
+        Returns:
+            (是否成功, 提示信息)
+        """
+        try:
+            prices = np.asarray(prices, dtype=np.float64)
+            shares = np.asarray(shares, dtype=np.float64)
+            error = self._check_batch(stock_codes, stock_names, prices, shares)
+            if error:
+                return False, error
+            shares = shares.astype(np.int64)
+            amounts = prices * shares
+            commissions = self.calculate_commissions(amounts)
+
+            if (amounts + commissions).sum() > self.account.available_cash:
+                return False, "资金不足"
+
+            with self.batch():
+                for row in zip(stock_codes, stock_names, prices.tolist(), shares.tolist(),
+                               amounts.tolist(), commissions.tolist()):
+                    self._apply_buy(*row)
+                self.update_account_stats()
+
+            return True, "买入成功"
+        except Exception as e:
+            return False, f"买入失败: {str(e)}"
+
+    def sell_stocks_batch(self, stock_codes: list, stock_names: list, prices, shares) -> tuple[bool, str]:
+        """
+        批量卖出（用于回测等批量重放），全部成交或全部不成交
+
+        各参数长度不一致、存在非正的价格或股数、股数不是整数时整批拒绝。
+
+        Args:
+            stock_codes: 股票代码列表（同一股票可出现多次）
+            stock_names: 股票名称列表
+            prices: 成交价格（与stock_codes等长）
+            shares: 卖出股数（与stock_codes等长）
+
+        Returns:
+            (是否成功, 提示信息)
+        """
+        try:
+            prices = np.asarray(prices, dtype=np.float64)
+            shares = np.asarray(shares, dtype=np.float64)
+            error = self._check_batch(stock_codes, stock_names, prices, shares)
+            if error:
+                return False, error
+            shares = shares.astype(np.int64)
+
+            # 同一股票的卖出数量合计后再与持仓比较
+            requested = {}
+            for stock_code, n in zip(stock_codes, shares.tolist()):
+                requested[stock_code] = requested.get(stock_code, 0) + n
+            for stock_code, n in requested.items():
+                position = self._positions.get(stock_code)
+                if not position:
+                    return False, "未持有该股票"
+                if n > position.shares:
+                    return False, "持仓数量不足"
+
+            amounts = prices * shares
+            commissions = self.calculate_commissions(amounts)
+
+            with self.batch():
+                for row in zip(stock_codes, stock_names, prices.tolist(), shares.tolist(),
+                               amounts.tolist(), commissions.tolist()):
+                    self._apply_sell(*row)
+                self.update_account_stats()
+
+            return True, "卖出成功"
+        except Exception as e:
+            return False, f"卖出失败: {str(e)}"
+
     def update_positions_price(self, stock_code: str, current_price: float):
-        for position in self.positions:
-            if position.stock_code == stock_code:
-                position.update_price(current_price)
+        position = self._positions.get(stock_code)
+        if position:
+            position.update_price(current_price)
+            self._dirty['positions'] = True
         self.update_account_stats()
         self.save_all()
 
     def update_all_positions_price(self, price_dict: dict):
-        for position in self.positions:
-            if position.stock_code in price_dict:
-                position.update_price(price_dict[position.stock_code])
-        self.update_account_stats()
+        # 刷新价格与汇总市值在同一次遍历中完成
+        # 遍历副本：其他请求线程可能同时买入新股票或清仓，直接遍历字典会因大小变化而报错
+        market_value = 0.0
+        for stock_code, position in list(self._positions.items()):
+            price = price_dict.get(stock_code)
+            if price is not None:
+                position.update_price(price)
+                self._dirty['positions'] = True
+            market_value += position.market_value
+        self.update_account_stats(market_value)
         self.save_all()
 
-    def update_account_stats(self):
-        market_value = sum(p.market_value for p in self.positions)
+    def update_account_stats(self, market_value: float = None):
+        """
+        根据持仓市值更新账户统计，调用方已算出总市值时可直接传入
+
+        市值仍由各Position对象逐个汇总：模拟账户持仓很少，没有另外维护按列存储的数组。
+        """
+        if market_value is None:
+            market_value = sum(p.market_value for p in list(self._positions.values()))
         self.account.total_assets = self.account.available_cash + market_value
         self.account.total_profit = self.account.total_assets - self.account.initial_capital
         self.account.profit_rate = (self.account.total_profit / self.account.initial_capital) * 100
+        self._dirty['account'] = True
+
+    def _record_trade(self, trade: Trade):
+        """记录一笔成交：买卖同时改变了账户和持仓"""
+        self.trades.append(trade)
+        self._pending_trades.append(trade)
+        self._dirty['trades'] = True
+        self._dirty['positions'] = True
+
+    @contextmanager
+    def batch(self):
+        """
+        批量修改：块内的买卖和价格更新不写盘，退出时一次性写入有变化的文件
+
+        with trading_engine.batch():
+            for ... in ...:
+                trading_engine.buy_stock(...)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self.auto_save:
+                self._save(throttle=False)
 
     def save_all(self):
-        self.data_manager.save_account(self.account)
-        self.data_manager.save_positions(self.positions)
-        self.data_manager.save_trades(self.trades)
+        """
+        保存修改：交易记录立即追加；账户和持仓快照距上次写盘不足SNAPSHOT_INTERVAL秒时
+        推迟到间隔结束后写入。batch()块内或auto_save为False时不写盘。
+        """
+        if self._batch_depth or not self.auto_save:
+            return
+        self._save()
+
+    def _save(self, throttle: bool = True):
+        with self._snapshot_lock:
+            if self._dirty['trades']:
+                trades, self._pending_trades = self._pending_trades, []
+                self._dirty['trades'] = False
+                self.data_manager.append_trades(trades)
+            if not (self._dirty['account'] or self._dirty['positions']):
+                return
+            if throttle:
+                if self._snapshot_timer is not None:
+                    return
+                wait = self._last_snapshot + Config.SNAPSHOT_INTERVAL - time.monotonic()
+                if wait > 0:
+                    self._snapshot_timer = threading.Timer(wait, self._snapshot_due)
+                    self._snapshot_timer.daemon = True
+                    self._snapshot_timer.start()
+                    return
+            elif self._snapshot_timer is not None:
+                self._snapshot_timer.cancel()
+                self._snapshot_timer = None
+            self._write_snapshot()
+
+    def _snapshot_due(self):
+        with self._snapshot_lock:
+            self._snapshot_timer = None
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        # 调用方需持有_snapshot_lock；只写入有变化的部分
+        self._last_snapshot = time.monotonic()
+        account = self.account if self._dirty['account'] else None
+        positions = list(self._positions.values()) if self._dirty['positions'] else None
+        self._dirty['account'] = self._dirty['positions'] = False
+        if account is not None or positions is not None:
+            self.data_manager.save_all_async(account, positions)
+
+    def flush(self):
+        """立即写入所有未保存的修改，并等待所有写盘任务完成"""
+        self._save(throttle=False)
+        self.data_manager.flush()
 
     def reset_account(self):
         self.account = Account(Config.INITIAL_CAPITAL)
-        self.positions = []
+        self._positions = {}
         self.trades = []
-        self.save_all()
+        self._pending_trades = []
+        self._dirty.update(account=True, positions=True, trades=False)
+        self.data_manager.clear_trades()
+        self.flush()
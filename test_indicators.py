@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+测试技术指标的增量计算与批量计算（离线，使用伪造的行情接口）
+"""
+
+import sys
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到Python路径，以包的形式导入backend（模块内使用相对导入）
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend._kernels import bb_kernel, macd_kernel, rsi_kernel, sma_series
+from backend.eastmoney_api import Quote
+from backend.strategies import IndicatorState, StrategyEngine, _history_arrays
+
+
+def _dates(n, start=date(2024, 1, 1)):
+    return [(start + timedelta(days=i)).isoformat() for i in range(n)]
+
+
+def _history(n, seed=0):
+    """生成n天的随机游走K线"""
+    rng = np.random.default_rng(seed)
+    closes = 10 + np.cumsum(rng.normal(0, 0.2, n))
+    return [{'date': d, 'open': c, 'close': c, 'high': c + 0.1, 'low': c - 0.1, 'volume': 10000}
+            for d, c in zip(_dates(n), closes.tolist())]
+
+
+def _quote(code, bars):
+    last, prev = bars[-1]['close'], bars[-2]['close']
+    return Quote(code, '股票' + code, last + 0.05, last, last + 0.1, last - 0.1, prev,
+                 12000, 1.2e6, last + 0.05 - prev, round((last + 0.05 - prev) / prev * 100, 2), 0)
+
+
+class FakeAPI:
+    """按股票代码返回固定K线和行情的行情接口，batch_codes为批量接口能返回的股票"""
+
+    def __init__(self, histories, batch_codes=None):
+        self.histories = histories
+        self.quotes = {code: _quote(code, bars) for code, bars in histories.items() if len(bars) >= 2}
+        self.batch_codes = set(self.quotes if batch_codes is None else batch_codes)
+
+    def get_stock_history(self, stock_code, period='day', count=30, use_cache=True):
+        return self.histories.get(stock_code)
+
+    def get_stock_quote(self, stock_code):
+        return self.quotes.get(stock_code)
+
+    def get_stock_quotes_batch(self, stock_codes):
+        return {code: self.quotes[code] for code in stock_codes if code in self.batch_codes and code in self.quotes}
+
+
+def _kernel_indicators(closes):
+    closes = np.ascontiguousarray(closes, dtype=np.float64)
+    ema12, ema26, dif, dea = macd_kernel(closes)
+    rsi, avg_gain, avg_loss, _, _ = rsi_kernel(closes, 14)
+    ma20, std = bb_kernel(closes, 20)
+    return {'EMA12': ema12, 'EMA26': ema26, 'DIF': dif, 'DEA': dea, 'RSI': rsi,
+            'avg_gain': avg_gain, 'avg_loss': avg_loss, 'MA20': ma20, 'std': std}
+
+
+def _assert_matches_kernels(snapshot, closes):
+    for name, expected in _kernel_indicators(closes).items():
+        assert snapshot[name] == pytest.approx(expected, rel=1e-9, abs=1e-9), name
+
+
+@pytest.mark.parametrize('seed_length', [1, 5, 30])
+def test_indicator_state_matches_kernels(seed_length):
+    """逐个加入收盘价后的增量状态与对整段收盘价批量计算的结果一致"""
+    closes = np.array([bar['close'] for bar in _history(60, seed=1)])
+    dates = _dates(60)
+    state = IndicatorState(closes[:seed_length])
+    for i in range(seed_length, len(closes)):
+        state.update(closes[i], dates[i])
+        _assert_matches_kernels(state.snapshot(), closes[:i + 1])
+
+
+def test_indicator_state_same_day_revision():
+    """同一交易日的价格多次到达时只保留最后一次，与直接加入最终价格的结果相同"""
+    closes = np.array([bar['close'] for bar in _history(40, seed=2)])
+    state = IndicatorState(closes[:-1])
+    for price in (closes[-1] + 0.5, closes[-1] - 0.3, closes[-1]):
+        state.update(price, '2024-02-09')
+    assert state.count == len(closes)
+    _assert_matches_kernels(state.snapshot(), closes)
+
+
+def test_stream_update_out_of_order():
+    """早于已处理交易日的价格：先用历史数据重新初始化，再按交易日决定应用或丢弃"""
+    bars = _history(60, seed=3)
+    hist = _history_arrays(bars)
+    closes = list(hist.closes)
+    engine = StrategyEngine()
+    engine.api = FakeAPI({'600000': bars})
+    next_days = _dates(63)[60:]
+
+    engine.stream_update('600000', closes[-1] + 0.2, next_days[0])
+    engine.stream_update('600000', closes[-1] + 0.4, next_days[1])
+    assert engine.stream_update('600000', closes[-1] + 0.6, next_days[2])['date'] == next_days[2]
+
+    # 晚于历史最后交易日：重新初始化后追加
+    snapshot = engine.stream_update('600000', closes[-1] - 0.1, next_days[0])
+    assert snapshot['date'] == next_days[0]
+    assert snapshot['count'] == 61
+    _assert_matches_kernels(snapshot, closes + [closes[-1] - 0.1])
+
+    # 早于历史最后交易日：重新初始化，过期的价格被丢弃
+    snapshot = engine.stream_update('600000', 99.0, hist.dates[-2])
+    assert snapshot['date'] == hist.dates[-1]
+    assert snapshot['count'] == 60
+    _assert_matches_kernels(snapshot, closes)
+
+
+@pytest.mark.parametrize('strategy_type', ['ma', 'momentum', 'volume', 'macd', 'rsi', 'bollinger'])
+def test_analyze_batch_matches_analyze(strategy_type):
+    """批量分析与逐只分析的结果一致，包括批量接口缺失后逐只补取、历史不足和无行情的股票"""
+    histories = {'600000': _history(60, seed=4), '000001': _history(60, seed=5),
+                 '600519': _history(60, seed=6), '300750': _history(12, seed=7)}
+    codes = ['600000', '000001', '999999', '600519', '300750']
+    batch_engine = StrategyEngine()
+    batch_engine.api = FakeAPI(histories, batch_codes=['600000', '300750'])
+    single_engine = StrategyEngine()
+    single_engine.api = FakeAPI(histories)
+
+    batch = batch_engine.analyze_batch(codes, strategy_type, explain=True)
+    single = [single_engine.analyze(code, strategy_type, explain=True) for code in codes]
+    assert [r.to_dict() for r in batch] == [r.to_dict() for r in single]
+    assert batch[2].error and batch[0].error is None
+
+
+def test_sync_history_matches_kernels():
+    """sync_history追加新K线、修正当日K线和重新初始化后的指标与批量计算一致"""
+    bars = _history(60, seed=8)
+    closes = [bar['close'] for bar in bars]
+    engine = StrategyEngine()
+
+    _assert_matches_kernels(engine.sync_history('600000', bars[:50]), closes[:50])
+    snapshot = engine.sync_history('600000', bars[:51])
+    assert snapshot['count'] == 51
+    _assert_matches_kernels(snapshot, closes[:51])
+
+    revised = bars[:50] + [dict(bars[50], close=closes[50] + 0.3)]
+    _assert_matches_kernels(engine.sync_history('600000', revised), closes[:50] + [closes[50] + 0.3])
+
+    # 跳过了交易日：用传入的历史重新初始化
+    _assert_matches_kernels(engine.sync_history('600000', bars), closes)
+
+
+def test_stream_update_matches_kernels():
+    bars = _history(60, seed=9)
+    closes = [bar['close'] for bar in bars]
+    engine = StrategyEngine()
+    engine.api = FakeAPI({'600000': bars})
+    for i, day in enumerate(_dates(70)[60:]):
+        closes.append(closes[-1] * 1.01 if i % 3 else closes[-1] * 0.98)
+        snapshot = engine.stream_update('600000', closes[-1], day)
+    assert snapshot['count'] == 70
+    _assert_matches_kernels(snapshot, closes)
+
+
+@pytest.mark.parametrize('w', [1, 5, 20, 60])
+def test_sma_series_matches_rolling_mean(w):
+    closes = np.array([bar['close'] for bar in _history(60, seed=10)])
+    expected = [closes[i:i + w].mean() for i in range(len(closes) - w + 1)]
+    assert sma_series(closes, w) == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize('n, w', [(0, 5), (4, 5), (10, 0)])
+def test_sma_series_insufficient_data(n, w):
+    assert sma_series(np.ones(n), w).shape == (0,)
@@ -6,28 +6,18 @@
 import sys
 import os
 
-# 添加backend目录到Python路径
-backend_path = os.path.join(os.path.dirname(__file__), 'backend')
-sys.path.insert(0, backend_path)
+# 添加项目根目录到Python路径，以包的形式导入backend（模块内使用相对导入）
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# 使用__import__函数动态导入模块，避免相对导入问题
-sys.modules.pop('strategies', None)
-sys.modules.pop('eastmoney_api', None)
-
-# 导入模块
-strategies = __import__('strategies')
-eastmoney_api = __import__('eastmoney_api')
-
-# 获取类
-StrategyEngine = strategies.StrategyEngine
-EastMoneyAPI = eastmoney_api.EastMoneyAPI
+from backend.strategies import StrategyEngine
+from backend.eastmoney_api import EastMoneyAPI
 
 def test_strategies():
     """测试所有策略"""
     print("开始测试策略引擎...")
     
     # 创建策略引擎实例
-    engine = StrategyEngine()
+    engine = StrategyEngine(verbose=True)
     api = EastMoneyAPI()
     
     # 测试股票代码：贵州茅台（600519）
@@ -37,9 +27,9 @@ def test_strategies():
     print(f"\n1. 获取股票 {stock_code} 实时数据...")
     quote = api.get_stock_quote(stock_code)
     if quote:
-        print(f"   股票名称: {quote['stock_name']}")
-        print(f"   当前价格: {quote['current_price']:.2f}元")
-        print(f"   涨跌幅: {quote['change_percent']:.2f}%")
+        print(f"   股票名称: {quote.stock_name}")
+        print(f"   当前价格: {quote.current_price:.2f}元")
+        print(f"   涨跌幅: {quote.change_percent:.2f}%")
     else:
         print("   获取实时数据失败")
         return False
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+测试模拟交易引擎（离线，数据文件写入临时目录）
+"""
+
+import sys
+import os
+import logging
+import time
+
+import orjson
+import pytest
+
+# 添加项目根目录到Python路径，以包的形式导入backend（模块内使用相对导入）
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.config import Config
+from backend.trading_engine import DataManager, TradingEngine
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """将账户、持仓、交易记录文件重定向到临时目录"""
+    monkeypatch.setattr(Config, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'ACCOUNT_FILE', str(tmp_path / 'account.json'))
+    monkeypatch.setattr(Config, 'POSITIONS_FILE', str(tmp_path / 'positions.json'))
+    monkeypatch.setattr(Config, 'TRADES_FILE', str(tmp_path / 'trades.json'))
+    monkeypatch.setattr(Config, 'TRADES_LOG_FILE', str(tmp_path / 'trades.jsonl'))
+    return tmp_path
+
+
+@pytest.fixture
+def make_engine(data_dir):
+    """创建交易引擎；测试结束前写完所有延迟的快照，避免恢复Config后写到仓库的data目录"""
+    engines = []
+
+    def factory(**kwargs):
+        engines.append(TradingEngine(DataManager(), **kwargs))
+        return engines[-1]
+
+    yield factory
+    for engine in engines:
+        engine.flush()
+
+
+@pytest.fixture
+def engine(make_engine):
+    return make_engine()
+
+
+def _state(engine):
+    return (engine.account.to_dict(), [pos.to_dict() for pos in engine.get_positions()], len(engine.trades))
+
+
+@pytest.mark.parametrize('codes, names, prices, shares, message', [
+    (['600000'], ['浦发银行'], [10.0], [100.7], '股数必须为整数'),
+    (['600000'], ['浦发银行'], [10.0], [0.5], '股数必须为整数'),
+    (['600000'], ['浦发银行'], [10.0], [0], '价格和股数必须为正数'),
+    (['600000'], ['浦发银行'], [-10.0], [100], '价格和股数必须为正数'),
+    (['600000'], ['浦发银行'], [10.0, 10.0], [100, 100], '批量参数长度不一致'),
+    (['600000', '000001'], ['浦发银行', '平安银行'], [10.0, 1000.0], [100, 1000], '资金不足'),
+])
+def test_buy_stocks_batch_rejects_whole_batch(engine, codes, names, prices, shares, message):
+    """批量买入参数无效或资金不足时整批拒绝，账户、持仓和交易记录均不变"""
+    before = _state(engine)
+    assert engine.buy_stocks_batch(codes, names, prices, shares) == (False, message)
+    assert _state(engine) == before
+
+
+@pytest.mark.parametrize('codes, names, prices, shares, message', [
+    (['600000'], ['浦发银行'], [11.0], [50.5], '股数必须为整数'),
+    (['600000'], ['浦发银行'], [11.0], [0], '价格和股数必须为正数'),
+    (['600000', '600000'], ['浦发银行'], [11.0, 11.0], [100, 100], '批量参数长度不一致'),
+    (['600000', '600000'], ['浦发银行', '浦发银行'], [11.0, 11.0], [200, 200], '持仓数量不足'),
+])
+def test_sell_stocks_batch_rejects_whole_batch(engine, codes, names, prices, shares, message):
+    """批量卖出参数无效或持仓不足时整批拒绝"""
+    assert engine.buy_stock('600000', '浦发银行', 10.0, 300) == (True, '买入成功')
+    before = _state(engine)
+    assert engine.sell_stocks_batch(codes, names, prices, shares) == (False, message)
+    assert _state(engine) == before
+
+
+def test_batch_matches_single_trades(make_engine):
+    """批量买卖与逐笔买卖的结果一致"""
+    codes = ['600000', '000001', '600000']
+    names = ['浦发银行', '平安银行', '浦发银行']
+    prices = [10.0, 5.5, 10.2]
+    shares = [100, 1000, 200]
+
+    single = make_engine()
+    for row in zip(codes, names, prices, shares):
+        single.buy_stock(*row)
+    single.sell_stock('600000', '浦发银行', 11.0, 150)
+
+    batch = make_engine()
+    batch.reset_account()
+    assert batch.buy_stocks_batch(codes, names, prices, shares) == (True, '买入成功')
+    assert batch.sell_stocks_batch(['600000'], ['浦发银行'], [11.0], [150]) == (True, '卖出成功')
+
+    assert batch.account.available_cash == pytest.approx(single.account.available_cash)
+    assert batch.account.total_assets == pytest.approx(single.account.total_assets)
+    assert [pos.to_dict() for pos in batch.get_positions()] == [pos.to_dict() for pos in single.get_positions()]
+
+
+def _trade_dict(i):
+    return {
+        'trade_type': 'buy', 'stock_code': '600000', 'stock_name': '浦发银行', 'shares': 100,
+        'price': 10.0 + i, 'amount': 1000.0 + 100 * i, 'commission': 5.0,
+        'total_amount': 1005.0 + 100 * i, 'created_at': f'2024-01-0{i + 1}T09:30:00'
+    }
+
+
+def _write_log(data_dir, lines, trailing_newline=True):
+    body = b'\n'.join(lines)
+    if trailing_newline:
+        body += b'\n'
+    (data_dir / 'trades.jsonl').write_bytes(body)
+
+
+def test_load_trades_empty_file(data_dir):
+    _write_log(data_dir, [], trailing_newline=False)
+    manager = DataManager()
+    assert manager.load_trades() == []
+    assert manager.load_trades(since='2024-01-01') == []
+
+
+def test_load_trades_without_trailing_newline(data_dir):
+    _write_log(data_dir, [orjson.dumps(_trade_dict(i)) for i in range(3)], trailing_newline=False)
+    manager = DataManager()
+    assert [t.price for t in manager.load_trades()] == [10.0, 11.0, 12.0]
+    assert [t.price for t in manager.load_trades(since='2024-01-03')] == [12.0]
+
+
+def test_load_trades_skips_corrupt_line(data_dir, caplog):
+    """写入中断留下的损坏行被跳过并记录警告，前后的记录正常加载"""
+    lines = [orjson.dumps(_trade_dict(0)), b'{"trade_type": "bu', orjson.dumps(_trade_dict(1))]
+    _write_log(data_dir, lines)
+    manager = DataManager()
+    with caplog.at_level(logging.WARNING, logger='backend.trading_engine'):
+        trades = manager.load_trades()
+    assert [t.price for t in trades] == [10.0, 11.0]
+    assert '跳过损坏的交易记录' in caplog.text
+    assert f'偏移 {len(lines[0]) + 1}' in caplog.text
+    # 从末尾向前定位时同样跳过损坏行
+    assert [t.price for t in manager.load_trades(since='2024-01-01T12:00:00')] == [11.0]
+
+
+def test_load_trades_since(data_dir):
+    _write_log(data_dir, [orjson.dumps(_trade_dict(i)) for i in range(5)])
+    manager = DataManager()
+    assert len(manager.load_trades(since='2000-01-01')) == 5
+    assert [t.created_at for t in manager.load_trades(since='2024-01-04T09:30:00')] == [
+        '2024-01-04T09:30:00', '2024-01-05T09:30:00']
+    assert manager.load_trades(since='2099-01-01') == []
+
+
+def test_load_trades_migrates_legacy_json_once(data_dir):
+    """旧版trades.json只在交易日志不存在时迁移一次，之后从trades.jsonl读取"""
+    (data_dir / 'trades.json').write_bytes(orjson.dumps([_trade_dict(i) for i in range(3)]))
+    manager = DataManager()
+    assert [t.price for t in manager.load_trades()] == [10.0, 11.0, 12.0]
+    assert (data_dir / 'trades.jsonl').read_bytes().count(b'\n') == 3
+
+    (data_dir / 'trades.json').write_bytes(orjson.dumps([_trade_dict(4)]))
+    assert [t.price for t in manager.load_trades()] == [10.0, 11.0, 12.0]
+    assert [t.price for t in manager.load_trades(since='2024-01-02')] == [11.0, 12.0]
+
+
+def _saved_cash(data_dir):
+    return orjson.loads((data_dir / 'account.json').read_bytes())['available_cash']
+
+
+def test_snapshot_throttled_until_interval(data_dir, make_engine, monkeypatch):
+    """间隔内的修改推迟到定时器写盘，交易记录仍立即追加"""
+    monkeypatch.setattr(Config, 'SNAPSHOT_INTERVAL', 0.3)
+    engine = make_engine()
+    engine.buy_stock('600000', '浦发银行', 10.0, 100)
+    engine.data_manager.flush()
+    first = _saved_cash(data_dir)
+    assert first == engine.account.available_cash
+
+    engine.buy_stock('600000', '浦发银行', 10.0, 100)
+    engine.data_manager.flush()
+    assert _saved_cash(data_dir) == first
+    assert len(engine.data_manager.load_trades()) == 2
+
+    deadline = time.monotonic() + 3
+    while _saved_cash(data_dir) == first and time.monotonic() < deadline:
+        time.sleep(0.05)
+        engine.data_manager.flush()
+    assert _saved_cash(data_dir) == engine.account.available_cash
+
+
+def test_flush_writes_pending_snapshot(data_dir, make_engine, monkeypatch):
+    monkeypatch.setattr(Config, 'SNAPSHOT_INTERVAL', 60)
+    engine = make_engine()
+    engine.buy_stock('600000', '浦发银行', 10.0, 100)
+    engine.buy_stock('000001', '平安银行', 5.0, 100)
+    engine.flush()
+    assert _saved_cash(data_dir) == engine.account.available_cash
+    positions = orjson.loads((data_dir / 'positions.json').read_bytes())
+    assert [pos['stock_code'] for pos in positions] == ['600000', '000001']